@@ -37,8 +37,7 @@ class GButton(GCompound):
         frame = GRect(width, self.BUTTON_DEFAULT_HEIGHT)
         frame.set_filled(True)
         frame.set_fill_color("White")
-        self.add(frame)
-        self.add(label)
+        self.add_all([ frame, label ])
         self.text = text
         self.label = label
         self.frame = frame
@@ -152,7 +152,7 @@ class GameObject:
         if shape is not None:
             self._parent_win.remove(self._shape)
             self._shape = shape
-            self._shape.object_name = self._name  # Force GObject to have a GameObject name.
+            self._shape.set_user_data(self._name)  # Tag the GObject with its GameObject name.
             self._parent_win.add(self._shape)
         return self._shape
 
@@ -380,8 +380,9 @@ def clicker_game():
             # Setup the player score label.
             main_window.add(score_label, WINDOW_WIDTH - score_label.get_width() - 10, score_label.get_height())
 
-            # Start the game's update loop.
-            main_window.set_interval(update_game, 10)
+            # Start the game's update loop. Running it as a fixed-step frame loop keeps the
+            # targets moving at the same speed however long each update takes.
+            main_window.run_frames(update_game, 100)
 
     def click_action(event: GMouseEvent):
         """Respond to the player's mouse clicks."""
@@ -392,15 +393,15 @@ def clicker_game():
             # Get the GObject the player clicked on.
             shape_obj = main_window.get_element_at(event.get_x(), event.get_y())
 
-            # If GameObject forced it to have a name attribute, then it's a target
-            # for the player to click on, otherwise it's something else like a background
-            # element or part of the UI.
-            if getattr(shape_obj, "object_name", None) is not None:
+            # If GameObject tagged it with a name, then it's a target for the player to
+            # click on, otherwise it's something else like a background element or part of the UI.
+            object_name = shape_obj.get_user_data() if shape_obj is not None else None
+            if object_name is not None:
                 game_state.hits = game_state.hits + 1
                 main_window.remove(shape_obj)
 
                 # Look up how many points this object is worth and apply that to the player's score.
-                _, _, _, _, score = game_object_descriptions[shape_obj.object_name]
+                _, _, _, _, score = game_object_descriptions[object_name]
                 game_state.player_score = game_state.player_score + score
                 score_label.set_label(str(game_state.player_score))
                 score_label.set_location(WINDOW_WIDTH - score_label.get_width() - 10, score_label.get_height())
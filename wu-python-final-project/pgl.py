@@ -6,13 +6,15 @@ Tkinter, which is the most common graphics package for use with Python.
 """
 
 import atexit
-import inspect
+import bisect
+import collections
+import heapq
 import io
 import math
-import ssl
+import os
+import struct
 import sys
 import time
-import urllib.request
 
 # Version information
 
@@ -31,23 +33,22 @@ try:
 except Exception as e:
     print('Could not load tkinter: ' + str(e))
 
-try:
-    from PIL import ImageTk, Image          # pylint: disable=import-error
-    _image_model = "PIL"
-except Exception:
-    _image_model = "PhotoImage"
+# The PIL and NumPy libraries are slow to import, so they are loaded
+# the first time they are needed by _get_image_model and _load_numpy.
 
-spyder_flag = False
+_Image = None
+_ImageTk = None
+_image_model = None
+_np = None
+_numpy_checked = False
 
-try:
-    import spydercustomize as customize     # pylint: disable=import-error
-    spyder_flag = True
-except Exception:
-    try:
-        import sitecustomize as customize   # pylint: disable=import-error
-        spyder_flag = True
-    except Exception:
-        pass
+# Spyder installs its customization module before running a program,
+# so the flag can be set without importing anything.
+
+customize = sys.modules.get("spydercustomize")
+if customize is None:
+    customize = sys.modules.get("sitecustomize")
+spyder_flag = customize is not None
 
 if spyder_flag:
     try:
@@ -77,10 +78,13 @@ class GWindow(object):
     DEFAULT_WIDTH = 500
     DEFAULT_HEIGHT = 300
     MIN_WAKEUP = 20
+    URL_POLL_INTERVAL = 20
+    DEFAULT_IMAGE_CACHE_SIZE = 64 * 1024 * 1024
 
 # Constructor: GWindow
 
-    def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                 backend=None):
         """
         The constructor takes either of the following forms:
 
@@ -91,34 +95,72 @@ class GWindow(object):
 
         If the dimensions are missing, the constructor creates a
         <code>GWindow</code> with a default size.
-        """
-        try:
-            tk = tkinter._root
-            tk.deiconify()
-        except AttributeError:
-            tk = tkinter.Tk()
-            tkinter._root = tk
+
+        The optional <code>backend</code> parameter selects what the
+        window draws on.  The default, <code>"tk"</code>, opens a
+        tkinter window.  The value <code>"headless"</code> draws on a
+        <code>GHeadlessCanvas</code>, which needs no display, and
+        <code>"raster"</code> draws on a <code>GRasterCanvas</code> from
+        the pgl_raster module, which can also render the scene to an
+        image.  Any other
+        value is called with the width and height and must return an
+        object with the same interface as <code>GHeadlessCanvas</code>.
+        If <code>backend</code> is missing, the <code>PGL_BACKEND</code>
+        environment variable is used, which makes it possible to run an
+        unchanged program without a display.
+        """
+        if backend is None:
+            backend = os.environ.get("PGL_BACKEND", "tk")
         self._window_width = width
         self._window_height = height
-        self._tk = tk
-        self._tk.protocol("WM_DELETE_WINDOW", self._delete_window)
-        for w in tk.winfo_children():
-            w.destroy()
-        self._canvas = tkinter.Canvas(tk, width=width, height=height,
-                                      highlightthickness=0)
-        try:
-            self._canvas.pack()
-        except:
-            pass
-        if spyder_flag:
-            def cancel_topmost():
-                tk.attributes("-topmost", False)
-            tk.attributes("-topmost", True)
-            tk.focus_force()
-            self._canvas.after(0, cancel_topmost)
+        if backend == "tk":
+            self._headless = False
+            try:
+                tk = tkinter._root
+                tk.deiconify()
+            except AttributeError:
+                tk = tkinter.Tk()
+                tkinter._root = tk
+            self._tk = tk
+            self._tk.protocol("WM_DELETE_WINDOW", self._delete_window)
+            for w in tk.winfo_children():
+                w.destroy()
+            self._canvas = tkinter.Canvas(tk, width=width, height=height,
+                                          highlightthickness=0)
+            try:
+                self._canvas.pack()
+            except:
+                pass
+            if spyder_flag:
+                def cancel_topmost():
+                    tk.attributes("-topmost", False)
+                tk.attributes("-topmost", True)
+                tk.focus_force()
+                self._canvas.after(0, cancel_topmost)
+        else:
+            self._headless = True
+            if backend == "headless":
+                backend = GHeadlessCanvas
+            elif backend == "raster":
+                from pgl_raster import GRasterCanvas
+                backend = GRasterCanvas
+            self._canvas = backend(width, height)
+            self._tk = self._canvas
+            self._tk.protocol("WM_DELETE_WINDOW", self._delete_window)
         self._canvas.update()
         self._images = { }
-        self._timers = [ ]
+        self._image_cache = _GImageCache(GWindow.DEFAULT_IMAGE_CACHE_SIZE)
+        self._url_loads = collections.deque()
+        self._url_pending = 0
+        self._url_timer = None
+        self._timer_queue = _GTimerQueue(self)
+        self._profiler = None
+        self._retained = None
+        self._item_table = None
+        self._batch_depth = 0
+        self._rebuild_pending = False
+        self._dirty_locations = { }
+        self._dirty_properties = { }
         self._base = GCompound()
         self._base._gw = self
         self._event_manager = _EventManager(self)
@@ -148,7 +190,7 @@ class GWindow(object):
         Waits for events to happen in the window.
         """
         self._event_loop_started = True
-        tkinter._root.mainloop()
+        self._tk.mainloop()
 
 # Public method: request_focus
 
@@ -158,7 +200,7 @@ class GWindow(object):
         brings it to the top and ensures that key events are delivered to
         the window.
         """
-        tkinter._root.canvas.focus_set()
+        self._canvas.focus_set()
 
 # Public method: clear
 
@@ -184,6 +226,31 @@ class GWindow(object):
         """
         return self._window_height
 
+# Public method: is_headless
+
+    def is_headless(self):
+        """
+        Returns <code>True</code> if this window draws on a headless
+        canvas instead of a tkinter window.
+        """
+        return self._headless
+
+# Public method: get_canvas
+
+    def get_canvas(self):
+        """
+        Returns the canvas the window draws on, which is either a
+        <code>tkinter.Canvas</code> or a <code>GHeadlessCanvas</code>.
+        Both support the same methods for inspecting items, such as
+        <code>find_all</code>, <code>type</code>, <code>coords</code>,
+        and <code>itemcget</code>.
+        """
+        if self._profiler is not None:
+            return self._profiler._canvas
+        if self._retained is not None:
+            return self._retained._canvas
+        return self._canvas
+
 # Public method: add_event_listener
 
     def add_event_listener(self, type, fn):
@@ -192,6 +259,38 @@ class GWindow(object):
         """
         self._event_manager.add_event_listener(type, fn)
 
+# Public method: set_event_coalescing
+
+    def set_event_coalescing(self, flag):
+        """
+        Turns coalescing of mouse motion on or off.  When coalescing is
+        on, the <code>"mousemove"</code> and <code>"drag"</code>
+        listeners are called once with the latest position when the
+        window is idle or when the next frame of a
+        <code>run_frames</code> loop starts, rather than once for every
+        motion event the system delivers.  Any other mouse or key event
+        first delivers the pending motion, so listeners still see events
+        in order.  Coalescing is off by default.
+        """
+        self._event_manager.set_coalescing(flag)
+
+# Public method: is_event_coalescing
+
+    def is_event_coalescing(self):
+        """
+        Returns <code>True</code> if mouse motion events are coalesced.
+        """
+        return self._event_manager._coalescing
+
+# Public method: get_coalesced_event_count
+
+    def get_coalesced_event_count(self):
+        """
+        Returns the number of motion events that have been dropped
+        because a later event replaced them before they were delivered.
+        """
+        return self._event_manager._coalesced_count
+
 # Public method: repaint
 
     def repaint(self):
@@ -228,6 +327,16 @@ class GWindow(object):
         """
         self._base.add(gobj, x, y)
 
+# Public method: add_all
+
+    def add_all(self, gobjs, positions=None):
+        """
+        Adds every object in the iterable gobjs to the window, creating
+        their canvas items in a single pass.  See
+        <code>GCompound.add_all</code> for details.
+        """
+        self._base.add_all(gobjs, positions)
+
 # Public method: remove
 
     def remove(self, gobj):
@@ -243,7 +352,222 @@ class GWindow(object):
         Returns the topmost <code>GObject</code> containing the
         point (x, y), or <code>None</code> if no such object exists.
         """
-        return self._base.get_element_at(x, y)
+        if self._profiler is not None:
+            return self._profiler._find_element(x, y)
+        if self._item_table is None:
+            return self._base.get_element_at(x, y)
+        for gobj in self._get_candidates(x, y):
+            if gobj.contains(x, y):
+                return gobj
+        return None
+
+# Public method: set_hit_test_engine
+
+    def set_hit_test_engine(self, engine):
+        """
+        Selects how <code>get_element_at</code> finds the objects that
+        might contain a point.  The default engine, <code>"python"</code>,
+        searches the objects in the window, using the spatial index if
+        one is turned on.  The <code>"canvas"</code> engine asks the
+        canvas for the items near the point with
+        <code>find_overlapping</code>, which uses the spatial structure
+        that tkinter keeps for drawing, and maps them back to their
+        objects through a table filled in as objects are installed.
+        Either way the exact <code>contains</code> test decides.  Since
+        the canvas only reports what it draws, the canvas engine never
+        finds hidden objects and finds unfilled shapes only near their
+        outlines.
+        """
+        if engine == "python":
+            self._item_table = None
+        elif engine == "canvas":
+            if self._item_table is None:
+                self._item_table = { }
+                self._base._register_items(self._item_table)
+        else:
+            raise Exception("set_hit_test_engine: Illegal engine - " +
+                            str(engine))
+
+# Public method: get_hit_test_engine
+
+    def get_hit_test_engine(self):
+        """
+        Returns the name of the engine used by <code>get_element_at</code>.
+        """
+        if self._item_table is None:
+            return "python"
+        return "canvas"
+
+# Public method: set_profiling
+
+    def set_profiling(self, flag):
+        """
+        Turns the profiler for this window on or off.  While profiling
+        is on, the window counts and times its canvas operations,
+        rebuilds, hit tests, and timer callbacks frame by frame, as
+        described under <code>GProfiler</code>.  Profiling costs nothing
+        when it is off.
+        """
+        if flag and self._profiler is None:
+            self._profiler = GProfiler(self)
+            if self._retained is None:
+                self._canvas = _GProfiledCanvas(self._canvas, self._profiler)
+            else:
+                self._profiler._canvas = self._retained._canvas
+                self._retained._set_canvas(
+                    _GProfiledCanvas(self._retained._canvas, self._profiler))
+        elif not flag and self._profiler is not None:
+            self._profiler.set_overlay(False)
+            if self._retained is None:
+                self._canvas = self._profiler._canvas
+            else:
+                self._retained._set_canvas(self._profiler._canvas)
+            self._profiler = None
+
+# Public method: get_profiler
+
+    def get_profiler(self):
+        """
+        Returns the <code>GProfiler</code> for this window, or
+        <code>None</code> if profiling is off.
+        """
+        return self._profiler
+
+# Public method: set_retained_mode
+
+    def set_retained_mode(self, flag):
+        """
+        Turns retained-mode rendering on or off.  Normally a rebuild of
+        the window deletes every canvas item and creates them all again.
+        In retained mode the window remembers the items it has created
+        for each object, and a rebuild compares the scene against them:
+        an object keeps its items, which are only updated with
+        <code>coords</code> or <code>itemconfig</code> where something
+        has changed, and items are created or deleted only for objects
+        that are new or gone.  The stacking order is then repaired with
+        as few moves as possible.  Turning the mode on rebuilds the
+        window once so that every item is known.  The profiler, if it
+        is on, counts only the calls that reach the canvas.
+        """
+        if flag and self._retained is None:
+            self._retained = _GRetainedCanvas(self._canvas)
+            self._canvas = self._retained
+            self._rebuild()
+        elif not flag and self._retained is not None:
+            self._canvas = self._retained._canvas
+            self._retained = None
+
+# Public method: is_retained_mode
+
+    def is_retained_mode(self):
+        """
+        Returns <code>True</code> if retained-mode rendering is on.
+        """
+        return self._retained is not None
+
+# Public method: get_render_stats
+
+    def get_render_stats(self):
+        """
+        Returns a dictionary that counts what retained-mode rebuilds have
+        done with canvas items since the mode was turned on.  The keys
+        are <code>reused</code> (items kept by their objects),
+        <code>updated</code> (reused items that needed a
+        <code>coords</code> or <code>itemconfig</code> call),
+        <code>created</code>, <code>deleted</code>, and
+        <code>restacked</code> (items moved in the display list).  All
+        counts are zero when the mode is off.
+        """
+        if self._retained is None:
+            return dict.fromkeys(_GRetainedCanvas.STATS, 0)
+        return dict(self._retained._stats)
+
+# Public method: set_spatial_index
+
+    def set_spatial_index(self, flag, cell_size=None):
+        """
+        Turns the spatial index used by <code>get_element_at</code> on or
+        off for the objects in the window.  See
+        <code>GCompound.set_spatial_index</code> for details.
+        """
+        if cell_size is None:
+            cell_size = GCompound.DEFAULT_CELL_SIZE
+        self._base.set_spatial_index(flag, cell_size)
+
+# Public method: set_image_cache_size
+
+    def set_image_cache_size(self, max_bytes):
+        """
+        Sets the number of bytes of scaled and rotated images that the
+        window keeps for reuse.  A <code>GImage</code> whose scale and
+        rotation have not changed is redrawn from this cache instead of
+        being resampled.  The least recently used images are discarded
+        when the total size exceeds the limit; a limit of 0 turns the
+        cache off.
+        """
+        self._image_cache.set_max_bytes(max_bytes)
+
+# Public method: get_image_cache_stats
+
+    def get_image_cache_stats(self):
+        """
+        Returns a dictionary with the <code>hits</code>,
+        <code>misses</code>, <code>evictions</code>, <code>entries</code>,
+        <code>bytes</code>, and <code>max_bytes</code> of the image cache.
+        """
+        return self._image_cache.get_stats()
+
+# Public method: clear_image_cache
+
+    def clear_image_cache(self):
+        """
+        Discards every cached image.  The cache identifies an image by its
+        source object, so this method must be called if the pixels of an
+        image are changed in place while it is displayed.
+        """
+        self._image_cache.clear()
+
+# Public method: batch
+
+    def batch(self):
+        """
+        Returns a context manager that groups a set of changes to the
+        window into a single update.  Inside the block, moves and property
+        changes are recorded rather than sent to the canvas, and any
+        number of requested rebuilds collapse into one.  The merged
+        changes are applied when the outermost block exits, as in
+
+        <pre>
+           with gw.batch():
+               for gobj in targets:
+                   gobj.move(dx, dy)
+        </pre>
+        """
+        return _GBatch(self)
+
+# Public method: load_image
+
+    def load_image(self, url, x=0, y=0, on_load=None):
+        """
+        Starts loading the image at url in the background and returns a
+        <code>GImage</code> right away.  Until the image arrives, the
+        <code>GImage</code> shows a single transparent pixel, but it can
+        be added to the window and moved like any other object.  When
+        the download completes, the window swaps in the real image and
+        calls on_load with the <code>GImage</code>, always on the thread
+        that runs the event loop.  If the download fails, the placeholder
+        remains and <code>get_load_error</code> returns the exception.
+        Downloads go through the disk cache described under
+        <code>GImage.set_url_cache</code>.
+        """
+        gimage = GImage._create_placeholder(url, x, y)
+        self._url_pending += 1
+        _get_url_executor().submit(self._load_url_image, gimage, url,
+                                   on_load)
+        if self._url_timer is None:
+            self._url_timer = self.set_interval(self._poll_url_loads,
+                                                GWindow.URL_POLL_INTERVAL)
+        return gimage
 
 # Public method: create_timer
 
@@ -280,14 +604,36 @@ class GWindow(object):
         timer.start()
         return timer
 
+# Public method: run_frames
+
+    def run_frames(self, update, hz=60, render=None,
+                   max_steps=None):
+        """
+        Creates and starts a frame loop that calls update at a fixed rate
+        of hz times per second of wall-clock time, no matter how long
+        each call takes.  If the loop falls behind, it calls update
+        several times before the next frame to catch up, but never more
+        than max_steps times.  The optional render function is called
+        once after the updates of each frame.  The run_frames method
+        returns the <code>GFrameLoop</code> object, which reports the
+        measured frame rate.
+        """
+        loop = GFrameLoop(self, update, hz, render, max_steps)
+        loop.start()
+        return loop
+
 # Public method: pause
 
     def pause(self, delay):
         """
         Pauses the current thread for the specified delay, which is
         measured in milliseconds.  The pause method periodically checks
-        the event queue to update the contents of the window.
+        the event queue to update the contents of the window.  In a
+        headless window, the pause advances the simulated clock instead.
         """
+        if self._headless:
+            self._canvas.advance(delay)
+            return
         n_cycles = delay // GWindow.MIN_WAKEUP
         for i in range(n_cycles):           # pylint: disable=unused-variable
             self._tk.update_idletasks()
@@ -332,6 +678,7 @@ class GWindow(object):
 
 # Public static method: convert_color_to_rgb
 
+    @staticmethod
     def convert_color_to_rgb(color_name):
         """
         Converts a color name into an integer that encodes the
@@ -360,22 +707,34 @@ class GWindow(object):
         try:
             self._active = False
             try:
-                for timer in self._timers:
-                    timer.stop()
+                self._timer_queue.clear()
             except:
                 pass
-            tkinter._root.destroy()
-            del tkinter._root
+            self._tk.destroy()
+            if not self._headless:
+                del tkinter._root
+                _font_table.clear()
         except:
             pass
 
+# Private method: _get_time
+
+    def _get_time(self):
+        """
+        Returns the current time in milliseconds, which is the simulated
+        time in a headless window.
+        """
+        if self._headless:
+            return self._canvas.get_time()
+        return 1000 * time.perf_counter()
+
 # Private method: _start_event_loop
 
     def _start_event_loop(self):
         """
         Starts the event loop if it wasn't run explicitly.
         """
-        if not self._event_loop_started:
+        if not self._event_loop_started and self._active:
             self.event_loop()
 
 # Private method: _rebuild
@@ -383,10 +742,127 @@ class GWindow(object):
     def _rebuild(self):
         """
         Rebuilds the tkinter data structure for the window.  This
-        operation is triggered if a global update is necessary.
+        operation is triggered if a global update is necessary.  Inside
+        a batch, the rebuild is postponed until the batch ends.
+        """
+        if self._batch_depth > 0:
+            self._rebuild_pending = True
+            return
+        start = time.perf_counter()
+        if self._retained is None:
+            self._canvas.delete("all")
+            self._base._install(self, _GTransform())
+        else:
+            self._retained._begin_render()
+            self._base._install(self, _GTransform())
+            self._retained._end_render()
+        if self._item_table is not None:
+            self._item_table.clear()
+            self._base._register_items(self._item_table)
+        if self._profiler is not None:
+            self._profiler._record("rebuild", time.perf_counter() - start)
+
+# Private method: _load_url_image
+
+    def _load_url_image(self, gimage, url, on_load):
+        """
+        Downloads and decodes an image for <code>load_image</code>.  This
+        method runs on a worker thread, so it only appends the result to
+        a queue that <code>_poll_url_loads</code> drains.
         """
-        self._canvas.delete("all")
-        self._base._install(self, _GTransform())
+        try:
+            image = _Image.open(io.BytesIO(_fetch_url(url)))
+            image.load()
+            result = image
+        except Exception as e:
+            result = e
+        self._url_loads.append((gimage, result, on_load))
+
+# Private method: _poll_url_loads
+
+    def _poll_url_loads(self):
+        """
+        Swaps in the images that have finished loading.  The polling
+        timer stops when no loads are pending.
+        """
+        loads = self._url_loads
+        while len(loads) > 0:
+            gimage, result, on_load = loads.popleft()
+            self._url_pending -= 1
+            if isinstance(result, Exception):
+                gimage._load_error = result
+            else:
+                gimage._set_image(result)
+                if on_load is not None:
+                    on_load(gimage)
+        if self._url_pending == 0 and self._url_timer is not None:
+            self._url_timer.stop()
+            self._url_timer = None
+
+# Private method: _create_photo
+
+    def _create_photo(self, img):
+        """
+        Returns an image object that the canvas can display for the PIL
+        image img.
+        """
+        if self._headless:
+            return _GHeadlessPhoto(img)
+        return _ImageTk.PhotoImage(img)
+
+# Private method: _get_candidates
+
+    def _get_candidates(self, x, y):
+        """
+        Returns the objects at the top level of the window that might
+        contain (x, y), topmost first, as chosen by the hit-test engine.
+        """
+        base = self._base
+        if self._item_table is None:
+            if base._spatial_index is not None:
+                return base._spatial_index.get_candidates(x, y)
+            return reversed(base._contents)
+        t = max(__LINE_TOLERANCE__, __ARC_TOLERANCE__)
+        tkids = self._canvas.find_overlapping(x - t, y - t, x + t, y + t)
+        table = self._item_table
+        candidates = [ ]
+        seen = { }
+        for tkid in reversed(tkids):
+            gobj = table.get(tkid)
+            if gobj is None:
+                continue
+            while gobj._parent is not None and gobj._parent is not base:
+                gobj = gobj._parent
+            if gobj._parent is base and id(gobj) not in seen:
+                seen[id(gobj)] = None
+                candidates.append(gobj)
+        return candidates
+
+# Private method: _flush_batch
+
+    def _flush_batch(self):
+        """
+        Applies the changes recorded during a batch.  If a rebuild was
+        requested, it reinstalls everything from the current state and
+        the individual changes are discarded.  Otherwise each dirty
+        object is moved at most once and receives a single itemconfig
+        call with its merged options.
+        """
+        locations = self._dirty_locations
+        properties = self._dirty_properties
+        self._dirty_locations = { }
+        self._dirty_properties = { }
+        if self._rebuild_pending:
+            self._rebuild_pending = False
+            self._rebuild()
+            return
+        for gobj in locations.values():
+            if gobj._get_window() is self:
+                gobj._update_location()
+        tkc = self._canvas
+        for gobj, options in properties.values():
+            if gobj._tkid is not None and gobj._get_window() is self:
+                tkc.itemconfig(gobj._tkid, **options)
 
 # Define camel-case names
 
@@ -394,13 +870,32 @@ class GWindow(object):
     requestFocus = request_focus
     getWidth = get_width
     getHeight = get_height
+    isHeadless = is_headless
+    getCanvas = get_canvas
+    addAll = add_all
     addEventListener = add_event_listener
+    setEventCoalescing = set_event_coalescing
+    isEventCoalescing = is_event_coalescing
+    getCoalescedEventCount = get_coalesced_event_count
     setWindowTitle = set_window_title
     getWindowTitle = get_window_title
     getElementAt = get_element_at
+    setHitTestEngine = set_hit_test_engine
+    getHitTestEngine = get_hit_test_engine
+    setProfiling = set_profiling
+    getProfiler = get_profiler
+    setRetainedMode = set_retained_mode
+    isRetainedMode = is_retained_mode
+    getRenderStats = get_render_stats
+    setSpatialIndex = set_spatial_index
+    setImageCacheSize = set_image_cache_size
+    getImageCacheStats = get_image_cache_stats
+    clearImageCache = clear_image_cache
+    loadImage = load_image
     createTimer = create_timer
     setTimeout = set_timeout
     setInterval = set_interval
+    runFrames = run_frames
     getProgramName = get_program_name
     getScreenWidth = get_screen_width
     getScreenHeight = get_screen_height
@@ -424,6 +919,10 @@ class GObject(object):
     individual subclasses.
     """
 
+    __slots__ = ("_x", "_y", "_sf", "_angle", "_color", "_line_width",
+                 "_visible", "_parent", "_tkid", "_gw", "_window",
+                 "_ctm_base", "_drawn_x", "_drawn_y", "_z", "_user_data")
+
 # Constructor: GObject
 
     def __init__(self):
@@ -441,6 +940,12 @@ class GObject(object):
         self._parent = None
         self._tkid = None
         self._gw = None
+        self._window = None
+        self._ctm_base = None
+        self._drawn_x = 0.0
+        self._drawn_y = 0.0
+        self._z = 0
+        self._user_data = None
 
 # Public method: get_x
 
@@ -479,6 +984,7 @@ class GObject(object):
         self._x = x
         self._y = y
         self._update_location()
+        self._bounds_changed()
 
 # Public method: move
 
@@ -552,10 +1058,11 @@ class GObject(object):
         usually one of the CSS color names.  The color can also be specified
         as a string in the form <code>"#rrggbb"</code> where <code>rr</code>,
         <code>gg</code>, and <code>bb</code> are pairs of hexadecimal digits
-        indicating the red, green, and blue components of the color.
+        indicating the red, green, and blue components of the color, or as
+        an integer such as the result of
+        <code>GWindow.convert_color_to_rgb</code>.
         """
-        rgb = _convert_color_to_rgb(color)
-        self._color = _convert_rgb_to_color(rgb)
+        self._color = _resolve_color(color)
         self._update_color()
 
 # Public method: get_color
@@ -596,6 +1103,26 @@ class GObject(object):
         self._visible = flag
         self._update_visible()
 
+# Public method: set_user_data
+
+    def set_user_data(self, data):
+        """
+        Attaches an arbitrary value to this object, which the library
+        itself never examines.  Graphical objects have a fixed set of
+        attributes, so this slot is the place for client information
+        such as a name or a reference to a game object.
+        """
+        self._user_data = data
+
+# Public method: get_user_data
+
+    def get_user_data(self):
+        """
+        Returns the value set by <code>set_user_data</code>, or
+        <code>None</code> if no value has been set.
+        """
+        return self._user_data
+
 # Public method: is_visible
 
     def is_visible(self):
@@ -715,6 +1242,13 @@ class GObject(object):
         gw = self._get_window()
         if gw is None:
             return
+        if gw._batch_depth > 0:
+            key = id(self)
+            if key in gw._dirty_properties:
+                gw._dirty_properties[key][1].update(options)
+            else:
+                gw._dirty_properties[key] = (self, options)
+            return
         tkc = gw._canvas
         tkc.itemconfig(self._tkid, **options)
 
@@ -723,23 +1257,18 @@ class GObject(object):
     def _update_location(self):
         """
         Updates the location for this object from the stored x and y
-        values.  Some subclasses need to override this method.
+        values.  The object remembers the location at which it was last
+        drawn, so the canvas item is moved by the difference without
+        reading its coordinates back from tkinter.  Some subclasses need
+        to override this method.
         """
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        offx = 0
-        offy = 0
-        gobj = self.get_parent()
-        while gobj is not None:
-            offx += gobj._x
-            offy += gobj._y
-            gobj = gobj.get_parent()
-        dx = (self._x + offx) - coords[0]
-        dy = (self._y + offy) - coords[1]
-        tkc.move(self._tkid, dx, dy)
+        if gw._batch_depth > 0:
+            gw._dirty_locations[id(self)] = self
+            return
+        self._move_drawn(gw, self._x, self._y)
 
 # Protected method: _update_color
 
@@ -757,9 +1286,9 @@ class GObject(object):
         Updates the visible property.
         """
         if self._visible:
-            self._update_properties(state=tkinter.NORMAL)
+            self._update_properties(state="normal")
         else:
-            self._update_properties(state=tkinter.HIDDEN)
+            self._update_properties(state="hidden")
 
 # Protected method: _update_rotation
 
@@ -776,13 +1305,78 @@ class GObject(object):
         """
         Returns the <code>GWindow</code> in which this <code>GObject</code>
         is installed.  If the object is not installed in a window, this
-        method returns <code>None</code>.
+        method returns <code>None</code>.  Installed objects remember
+        their window, so only objects waiting to be installed need to
+        walk up the parent chain.
         """
+        if self._window is not None:
+            return self._window
         gobj = self
         while gobj._parent is not None:
             gobj = gobj._parent
         return gobj._gw
 
+# Private method: _bounds_changed
+
+    def _bounds_changed(self):
+        """
+        Tells the enclosing compounds that the bounds of this object have
+        changed, so that they discard their cached bounds and any spatial
+        index they keep is brought up to date before its next query.  The
+        walk stops at the first compound whose bounds are already out of
+        date, since the change that cleared them has already been passed
+        on to every compound above it.
+        """
+        gobj = self
+        parent = self._parent
+        while parent is not None:
+            if parent._spatial_index is not None:
+                parent._spatial_index.invalidate(gobj)
+            if parent._local_bounds is None:
+                return
+            parent._local_bounds = None
+            gobj = parent
+            parent = gobj._parent
+
+# Private method: _begin_install
+
+    def _begin_install(self, target, ctm):
+        """
+        Records the state shared by every installed object: the window,
+        the transformation of the enclosing compound, and the location
+        at which the object is drawn.  The cached transformation is only
+        replaced when the object is installed again, which happens
+        whenever an enclosing compound moves.  Since the new item is
+        drawn from the current state, any options queued for the old
+        item in a batch are dropped.
+        """
+        target._dirty_properties.pop(id(self), None)
+        self._window = target
+        self._ctm_base = ctm
+        self._drawn_x = self._x
+        self._drawn_y = self._y
+        if target._retained is not None:
+            target._retained._current = self
+
+# Private method: _move_drawn
+
+    def _move_drawn(self, gw, x, y):
+        """
+        Moves the canvas item so that the point drawn at the stored
+        location ends up at (x, y), where both are given in the
+        coordinates of the enclosing compound.
+        """
+        dx = x - self._drawn_x
+        dy = y - self._drawn_y
+        if dx == 0 and dy == 0:
+            return
+        self._drawn_x = x
+        self._drawn_y = y
+        ctm = self._ctm_base
+        if ctm._rotation != 0 or ctm._sf != 1:
+            dx, dy = ctm.transform_vector(dx, dy)
+        gw._canvas.move(self._tkid, dx, dy)
+
 # Private abstract method: _install
 
     def _install(self, target, ctm):
@@ -792,6 +1386,83 @@ class GObject(object):
         """
         raise Exception("_install is not defined in the GObject class")
 
+# Protected method: _uninstall
+
+    def _uninstall(self, target):
+        """
+        Deletes the tkinter objects created by <code>_install</code> for
+        this object and any objects it contains, leaving every other item
+        on the canvas alone.  The items are deleted in a single call.
+        """
+        items = [ ]
+        self._release_items(items)
+        if len(items) > 0:
+            target._canvas.delete(*items)
+            table = target._item_table
+            if table is not None:
+                for tkid in items:
+                    table.pop(tkid, None)
+
+# Protected method: _release_items
+
+    def _release_items(self, items):
+        """
+        Appends the tkinter ids owned by this object to the items list
+        and forgets them.  Subclasses that own more than one item need
+        to override this method.
+        """
+        if self._tkid is not None:
+            items.append(self._tkid)
+            self._tkid = None
+        self._window = None
+
+# Private method: _collect_items
+
+    def _collect_items(self, items):
+        """
+        Appends the tkinter ids owned by this object to the items list in
+        display order.
+        """
+        if self._tkid is not None:
+            items.append(self._tkid)
+
+# Private method: _add_tag
+
+    def _add_tag(self, tkc, tag):
+        """
+        Adds tag to the tkinter items owned by this object.
+        """
+        if self._tkid is not None:
+            tkc.addtag_withtag(tag, self._tkid)
+
+# Private method: _register_items
+
+    def _register_items(self, table):
+        """
+        Enters the tkinter items owned by this object in the table that
+        maps item ids to objects for the canvas hit-test engine.
+        """
+        if self._tkid is not None:
+            table[self._tkid] = self
+
+# Private method: _bottom_item
+
+    def _bottom_item(self):
+        """
+        Returns the lowest tkinter id owned by this object, or
+        <code>None</code> if it has no items on the canvas.
+        """
+        return self._tkid
+
+# Private method: _top_item
+
+    def _top_item(self):
+        """
+        Returns the highest tkinter id owned by this object, or
+        <code>None</code> if it has no items on the canvas.
+        """
+        return self._tkid
+
 # Define camel-case names
 
     getX = get_x
@@ -808,6 +1479,8 @@ class GObject(object):
     getColor = get_color
     setVisible = set_visible
     isVisible = is_visible
+    setUserData = set_user_data
+    getUserData = get_user_data
     sendForward = send_forward
     sendToFront = send_to_front
     sendBackward = send_backward
@@ -828,6 +1501,8 @@ class GFillableObject(GObject):
     This abstract class is the superclass of all objects that are fillable.
     """
 
+    __slots__ = ("_fill_flag", "_fill_color")
+
 # Constructor: GFillableObject
 
     def __init__(self):
@@ -862,9 +1537,10 @@ class GFillableObject(GObject):
     def set_fill_color(self, color):
         """
         Sets the color used to display the filled region of the object.
+        The color parameter takes the same forms as in
+        <code>set_color</code>.
         """
-        rgb = _convert_color_to_rgb(color)
-        self._fill_color = _convert_rgb_to_color(rgb)
+        self._fill_color = _resolve_color(color)
         self._update_color()
 
 # Public method: get_fill_color
@@ -914,6 +1590,8 @@ class GRect(GFillableObject):
     a rectangular box.
     """
 
+    __slots__ = ("_width", "_height", "_rep")
+
 # Constructor: GRect
 
     def __init__(self, a1, a2, a3=None, a4=None):
@@ -954,8 +1632,9 @@ class GRect(GFillableObject):
             width, height = width.get_width(), width.get_height()
         self._width = width
         self._height = height
+        self._bounds_changed()
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
         tkc = gw._canvas
         coords = tkc.coords(self._tkid)
@@ -998,7 +1677,7 @@ class GRect(GFillableObject):
         """
         gw = target
         tkc = gw._canvas
-        self._ctm_base = ctm
+        self._begin_install(target, ctm)
         lctm = _GTransform(rotation=self._angle + ctm._rotation,
                            sf=self._sf * ctm._sf)
         p0 = ctm.transform(self._x, self._y)
@@ -1021,7 +1700,7 @@ class GRect(GFillableObject):
         Updates the points for this <code>GRect</code> after a rotation.
         """
         gw = self._get_window()
-        if gw is not None:
+        if gw is not None and self._tkid is not None:
             if self._rep == "Rectangle":
                 gw._rebuild()
             else:
@@ -1034,17 +1713,14 @@ class GRect(GFillableObject):
                                                   self._width, self._height,
                                                   lctm)
                 tkc.coords(self._tkid, *coords)
+                self._drawn_x = self._x
+                self._drawn_y = self._y
 
 # Private method: _create_rect_coords
 
     def _create_rect_coords(self, x, y, width, height, ctm):
-        p1 = ctm.transform(width, 0)
-        p2 = ctm.transform(width, height)
-        p3 = ctm.transform(0, height)
-        return [ x, y,
-                 x + p1._x, y + p1._y,
-                 x + p2._x, y + p2._y,
-                 x + p3._x, y + p3._y ]
+        return ctm.translate(x, y).transform_many([ 0, width, width, 0 ],
+                                                  [ 0, 0, height, height ])
 
 # Override method: __str__
 
@@ -1067,6 +1743,8 @@ class GOval(GFillableObject):
     a rectangular box.
     """
 
+    __slots__ = ("_width", "_height", "_rep")
+
 # Constructor: GOval
 
     def __init__(self, a1, a2, a3=None, a4=None):
@@ -1107,8 +1785,9 @@ class GOval(GFillableObject):
             width, height = width.get_width(), width.get_height()
         self._width = width
         self._height = height
+        self._bounds_changed()
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
         tkc = gw._canvas
         coords = tkc.coords(self._tkid)
@@ -1160,7 +1839,7 @@ class GOval(GFillableObject):
         """
         gw = target
         tkc = gw._canvas
-        self._ctm_base = ctm
+        self._begin_install(target, ctm)
         lctm = _GTransform(rotation=self._angle + ctm._rotation,
                            sf=self._sf * ctm._sf)
         p0 = ctm.transform(self._x, self._y)
@@ -1185,7 +1864,7 @@ class GOval(GFillableObject):
         Updates the points for this <code>GOval</code> after a rotation.
         """
         gw = self._get_window()
-        if gw is not None:
+        if gw is not None and self._tkid is not None:
             if self._rep == "Oval":
                 gw._rebuild()
             else:
@@ -1198,22 +1877,17 @@ class GOval(GFillableObject):
                                                   self._width, self._height,
                                                   lctm)
                 tkc.coords(self._tkid, *coords)
+                self._drawn_x = self._x
+                self._drawn_y = self._y
 
 # Private method: _create_oval_coords
 
     def _create_oval_coords(self, x, y, width, height, ctm):
-        n = 16
-        dth = 360 / n
         r1 = width / 2
         r2 = height / 2
-        coords = [ ]
-        for i in range(0, n):
-            theta = math.radians(i * dth)
-            pt = ctm.transform(r1 + r1 * math.cos(theta),
-                               r2 - r2 * math.sin(theta))
-            coords.append(x + pt._x)
-            coords.append(y + pt._y)
-        return coords
+        xs = [ r1 + r1 * ct for ct in _UNIT_CIRCLE_COS ]
+        ys = [ r2 - r2 * st for st in _UNIT_CIRCLE_SIN ]
+        return ctm.translate(x, y).transform_many(xs, ys)
 
 # Override method: __str__
 
@@ -1239,6 +1913,12 @@ class GCompound(GObject):
     to that location.
     """
 
+    __slots__ = ("_contents", "_spatial_index", "_local_bounds", "_tag")
+
+# Public constants
+
+    DEFAULT_CELL_SIZE = 64
+
 # Constructor: GCompound
 
     def __init__(self):
@@ -1247,6 +1927,9 @@ class GCompound(GObject):
         """
         GObject.__init__(self)
         self._contents = [ ]
+        self._spatial_index = None
+        self._local_bounds = None
+        self._tag = "compound" + str(id(self))
 
 # Public method: add
 
@@ -1259,14 +1942,77 @@ class GCompound(GObject):
         """
         if x is not None:
             gobj.set_location(x, y)
+        if len(self._contents) == 0:
+            gobj._z = 0
+        else:
+            gobj._z = self._contents[-1]._z + 1
         self._contents.append(gobj)
         gobj._parent = self
+        if self._spatial_index is not None:
+            self._spatial_index.add(gobj)
+        self._local_bounds = None
+        self._bounds_changed()
         if self._gw is None:
             gw = self._get_window()
             if gw is not None:
-                gw._rebuild()
-        else:
+                if self._window is not None and not gw._rebuild_pending:
+                    self._install_children(gw, len(self._contents) - 1, 1)
+                else:
+                    gw._rebuild()
+        elif not self._gw._rebuild_pending:
             gobj._install(self._gw, _GTransform())
+            if self._gw._item_table is not None:
+                gobj._register_items(self._gw._item_table)
+
+# Public method: add_all
+
+    def add_all(self, gobjs, positions=None):
+        """
+        Adds every object in the iterable gobjs to the
+        <code>GCompound</code>, in order, so that the last one ends up
+        in front.  If <code>positions</code> is supplied, it is a
+        parallel sequence of (x, y) pairs that give the locations of
+        the objects.  The objects are appended in one step and their
+        canvas items are created in a single pass, which makes this
+        method much faster than calling <code>add</code> in a loop when
+        the compound is already in a window.
+        """
+        gobjs = list(gobjs)
+        if positions is not None:
+            for gobj, (x, y) in zip(gobjs, positions):
+                gobj.set_location(x, y)
+        if len(gobjs) == 0:
+            return
+        start = len(self._contents)
+        if start == 0:
+            z = 0
+        else:
+            z = self._contents[-1]._z + 1
+        for gobj in gobjs:
+            gobj._z = z
+            gobj._parent = self
+            z += 1
+        self._contents.extend(gobjs)
+        if self._spatial_index is not None:
+            for gobj in gobjs:
+                self._spatial_index.add(gobj)
+        self._local_bounds = None
+        self._bounds_changed()
+        if self._gw is None:
+            gw = self._get_window()
+            if gw is not None:
+                if self._window is not None and not gw._rebuild_pending:
+                    self._install_children(gw, start, len(gobjs))
+                else:
+                    gw._rebuild()
+        elif not self._gw._rebuild_pending:
+            gw = self._gw
+            ctm = _GTransform()
+            for gobj in gobjs:
+                gobj._install(gw, ctm)
+            if gw._item_table is not None:
+                for gobj in gobjs:
+                    gobj._register_items(gw._item_table)
 
 # Public method: remove
 
@@ -1276,10 +2022,12 @@ class GCompound(GObject):
         """
         index = self._find_gobject(gobj)
         if index != -1:
+            gw = self._get_window()
             self._remove_at(index)
-        gw = self._get_window()
-        if gw is not None:
-            gw._rebuild()
+            if gw is not None:
+                gobj._uninstall(gw)
+            self._local_bounds = None
+            self._bounds_changed()
 
 # Public method: remove_all
 
@@ -1287,11 +2035,16 @@ class GCompound(GObject):
         """
         Removes all graphical objects from the <code>GCompound</code>.
         """
-        while len(self._contents) > 0:
-            self._remove_at(0)
         gw = self._get_window()
         if gw is not None:
-            gw._rebuild()
+            self._uninstall(gw)
+        for gobj in self._contents:
+            gobj._parent = None
+        self._contents = [ ]
+        if self._spatial_index is not None:
+            self._spatial_index.clear()
+        self._local_bounds = None
+        self._bounds_changed()
 
 # Public method: get_element_at
 
@@ -1301,11 +2054,40 @@ class GCompound(GObject):
         point (x, y), or <code>None</code> if no such object exists.
         Coordinates are interpreted relative to the reference point.
         """
+        if self._spatial_index is not None:
+            return self._spatial_index.get_element_at(x, y)
         for gobj in reversed(self._contents):
             if gobj.contains(x, y):
                 return gobj
         return None
 
+# Public method: set_spatial_index
+
+    def set_spatial_index(self, flag, cell_size=DEFAULT_CELL_SIZE):
+        """
+        Turns the spatial index used by <code>get_element_at</code> on or
+        off.  The index is a uniform grid of square cells whose side is
+        <code>cell_size</code> pixels.  Each object is entered in the
+        cells its bounding box overlaps, so a point query only tests the
+        objects in one cell.  The index follows <code>add</code>,
+        <code>remove</code>, and any change to the bounds of an object,
+        and it returns the same topmost object as the linear search.
+        """
+        if flag:
+            self._spatial_index = _GSpatialIndex(cell_size)
+            for gobj in self._contents:
+                self._spatial_index.add(gobj)
+        else:
+            self._spatial_index = None
+
+# Public method: has_spatial_index
+
+    def has_spatial_index(self):
+        """
+        Returns <code>True</code> if this compound keeps a spatial index.
+        """
+        return self._spatial_index is not None
+
 # Public method: get_element_count
 
     def get_element_count(self):
@@ -1328,37 +2110,35 @@ class GCompound(GObject):
 
     def get_bounds(self):
         """
-        Returns a bounding rectangle for this compound.
+        Returns a bounding rectangle for this compound.  The bounds of
+        the contents are cached relative to the origin of the compound,
+        so this method only visits the contents again after one of them
+        has changed.
         """
-        x0 = self._x
-        y0 = self._y
-        if len(self._contents) == 0:
-            return GRectangle(x0, y0, 0, 0)
-        x_min = sys.float_info.max
-        y_min = sys.float_info.max
-        x_max = sys.float_info.min
-        y_max = sys.float_info.min
-        for gobj in self._contents:
-            bounds = gobj.get_bounds()
-            x_min = min(x_min, x0 + bounds._x)
-            y_min = min(y_min, y0 + bounds._y)
-            x_max = max(x_max, x0 + bounds._x)
-            y_max = max(y_max, y0 + bounds._y)
-            x_min = min(x_min, x0 + bounds._x + bounds.get_width())
-            y_min = min(y_min, y0 + bounds._y + bounds.get_height())
-            x_max = max(x_max, x0 + bounds._x + bounds.get_width())
-            y_max = max(y_max, y0 + bounds._y + bounds.get_height())
-        return GRectangle(x_min, y_min, x_max - x_min, y_max - y_min)
+        bounds = self._get_local_bounds()
+        if bounds is None:
+            return GRectangle(self._x, self._y, 0, 0)
+        x_min, y_min, x_max, y_max = bounds
+        return GRectangle(self._x + x_min, self._y + y_min,
+                          x_max - x_min, y_max - y_min)
 
 # Public method: contains
 
     def contains(self, x, y):
         """
-        Returns true if the specified point is inside the object.
+        Returns true if the specified point is inside the object.  Points
+        outside the cached bounds, grown by the hit tolerance for lines
+        and arcs, are rejected without testing the contents.
         """
-        refpt = self.get_location()
-        tx = x - refpt._x
-        ty = y - refpt._y
+        bounds = self._get_local_bounds()
+        if bounds is None:
+            return False
+        tx = x - self._x
+        ty = y - self._y
+        t = max(__LINE_TOLERANCE__, __ARC_TOLERANCE__)
+        if tx < bounds[0] - t or tx > bounds[2] + t or \
+           ty < bounds[1] - t or ty > bounds[3] + t:
+            return False
         for gobj in self._contents:
             if gobj.contains(tx, ty):
                 return True
@@ -1377,45 +2157,217 @@ class GCompound(GObject):
     def __str__(self):
         return "GCompound(...)"
 
+# Private method: _get_local_bounds
+
+    def _get_local_bounds(self):
+        """
+        Returns the bounds of the contents relative to the origin of the
+        compound as a tuple (x_min, y_min, x_max, y_max), or
+        <code>None</code> if the compound is empty.  An empty tuple in
+        the cache records an empty compound, while <code>None</code>
+        means that the cache is out of date.
+        """
+        bounds = self._local_bounds
+        if bounds is None:
+            bounds = ()
+            for gobj in self._contents:
+                r = gobj.get_bounds()
+                x0 = r._x
+                y0 = r._y
+                x1 = x0 + r._width
+                y1 = y0 + r._height
+                if len(bounds) == 0:
+                    bounds = (x0, y0, x1, y1)
+                else:
+                    bounds = (min(bounds[0], x0), min(bounds[1], y0),
+                              max(bounds[2], x1), max(bounds[3], y1))
+            self._local_bounds = bounds
+        if len(bounds) == 0:
+            return None
+        return bounds
+
 # Override method: _update_location
 
     def _update_location(self):
         """
-        Updates the location for this <code>GCompound</code> by
-        rebuilding the entire window if the component is installed.
+        Updates the location for this <code>GCompound</code>.  Every item
+        inside the compound carries its tag, so the whole subtree moves
+        with a single canvas call, after which the cached transformations
+        of the contents are brought up to date.
         """
         gw = self._get_window()
-        if gw is not None:
+        if gw is None:
+            return
+        if self._window is None:
             gw._rebuild()
+            return
+        if gw._batch_depth > 0:
+            gw._dirty_locations[id(self)] = self
+            return
+        dx = self._x - self._drawn_x
+        dy = self._y - self._drawn_y
+        if dx == 0 and dy == 0:
+            return
+        self._drawn_x = self._x
+        self._drawn_y = self._y
+        ctm = self._ctm_base
+        if ctm._rotation != 0 or ctm._sf != 1:
+            dx, dy = ctm.transform_vector(dx, dy)
+        gw._canvas.move(self._tag, dx, dy)
+        self._shift_contents()
 
 # Override method: _update_rotation
 
     def _update_rotation(self):
         """
-        Redraws the window on rotation.
+        Reinstalls this compound after a rotation or a change in scale,
+        which no translation of the existing items can express.  Only
+        the items inside this compound are recreated.
         """
-        self._update_location()
+        gw = self._get_window()
+        if gw is None or gw._rebuild_pending:
+            return
+        if self._window is None or self._parent is None:
+            gw._rebuild()
+            return
+        self._uninstall(gw)
+        self._parent._install_children(gw, self._parent._find_gobject(self), 1)
 
 # Override method: _install
 
     def _install(self, target, ctm):
-        lctm = ctm.compose(_GTransform(self._x, self._y,
-                                       rotation=self._angle, sf=self._sf))
+        """
+        Installs the contents of the compound.  Every compound except the
+        one at the top of the window adds its tag to the items of its
+        contents, so that the items of a nested compound end up with the
+        tags of all the compounds that enclose it.
+        """
+        self._begin_install(target, ctm)
+        lctm = self._get_local_ctm()
+        tkc = target._canvas
         for gobj in self._contents:
             gobj._install(target, lctm)
+            if self._gw is None:
+                gobj._add_tag(tkc, self._tag)
 
-# Internal method: _send_forward
+# Override method: _add_tag
 
-    def _send_forward(self, gobj):
-        index = self._find_gobject(gobj)
-        if index == -1:
-            return
+    def _add_tag(self, tkc, tag):
+        tkc.addtag_withtag(tag, self._tag)
+
+# Override method: _register_items
+
+    def _register_items(self, table):
+        for gobj in self._contents:
+            gobj._register_items(table)
+
+# Private method: _get_local_ctm
+
+    def _get_local_ctm(self):
+        """
+        Returns the transformation from the coordinates inside this
+        installed compound to the canvas, as it is currently drawn.  The
+        compound at the top of the window is drawn without any
+        transformation.
+        """
+        if self._gw is not None:
+            return _GTransform()
+        return self._ctm_base.compose(_GTransform(self._drawn_x,
+                                                  self._drawn_y,
+                                                  rotation=self._angle,
+                                                  sf=self._sf))
+
+# Private method: _shift_contents
+
+    def _shift_contents(self):
+        """
+        Updates the cached transformation of every object inside this
+        compound after its items have been moved on the canvas.
+        """
+        lctm = self._get_local_ctm()
+        for gobj in self._contents:
+            gobj._ctm_base = lctm
+            if isinstance(gobj, GCompound):
+                gobj._shift_contents()
+
+# Private method: _install_children
+
+    def _install_children(self, gw, index, count):
+        """
+        Installs count objects starting at the specified index in the
+        contents of this installed compound, without touching the rest
+        of the window.  The new items are tagged with every enclosing
+        compound and moved into place in the display list, starting
+        with the neighbors of the new objects and moving outward until
+        some other items are found.
+        """
+        tkc = gw._canvas
+        gobjs = self._contents[index:index + count]
+        lctm = self._get_local_ctm()
+        for gobj in gobjs:
+            gobj._install(gw, lctm)
+        if gw._item_table is not None:
+            for gobj in gobjs:
+                gobj._register_items(gw._item_table)
+        node = self
+        while node is not None and node._gw is None:
+            for gobj in gobjs:
+                gobj._add_tag(tkc, node._tag)
+            node = node._parent
+        node = self
+        while not node._restack(index, count):
+            if node._parent is None:
+                break
+            index = node._parent._find_gobject(node)
+            count = 1
+            node = node._parent
+
+# Override method: _release_items
+
+    def _release_items(self, items):
+        """
+        Collects the tkinter ids for every object in this compound.
+        """
+        self._window = None
+        for gobj in self._contents:
+            gobj._release_items(items)
+
+# Override method: _collect_items
+
+    def _collect_items(self, items):
+        for gobj in self._contents:
+            gobj._collect_items(items)
+
+# Override method: _bottom_item
+
+    def _bottom_item(self):
+        for gobj in self._contents:
+            tkid = gobj._bottom_item()
+            if tkid is not None:
+                return tkid
+        return None
+
+# Override method: _top_item
+
+    def _top_item(self):
+        for gobj in reversed(self._contents):
+            tkid = gobj._top_item()
+            if tkid is not None:
+                return tkid
+        return None
+
+# Internal method: _send_forward
+
+    def _send_forward(self, gobj):
+        index = self._find_gobject(gobj)
+        if index == -1:
+            return
         if index != len(self._contents) - 1:
-            self._contents.pop(index)
-            self._contents.insert(index + 1, gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
+            other = self._contents[index + 1]
+            self._contents[index] = other
+            self._contents[index + 1] = gobj
+            gobj._z, other._z = other._z, gobj._z
+            self._restack(index + 1)
 
 # Internal method: _send_to_front
 
@@ -1425,10 +2377,9 @@ class GCompound(GObject):
             return
         if index != len(self._contents) - 1:
             self._contents.pop(index)
+            gobj._z = self._contents[-1]._z + 1
             self._contents.append(gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
+            self._restack(len(self._contents) - 1)
 
 # Internal method: _send_backward
 
@@ -1437,11 +2388,11 @@ class GCompound(GObject):
         if index == -1:
             return
         if index != 0:
-            self._contents.pop(index)
-            self._contents.insert(index - 1, gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
+            other = self._contents[index - 1]
+            self._contents[index] = other
+            self._contents[index - 1] = gobj
+            gobj._z, other._z = other._z, gobj._z
+            self._restack(index - 1)
 
 # Internal method: _send_to_back
 
@@ -1451,18 +2402,33 @@ class GCompound(GObject):
             return
         if index != 0:
             self._contents.pop(index)
+            gobj._z = self._contents[0]._z - 1
             self._contents.insert(0, gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
+            self._restack(0)
 
 # Internal method: _find_gobject
 
     def _find_gobject(self, gobj):
-        n = len(self._contents)
-        for i in range(n):
-            if self._contents[i] == gobj:
-                return i
+        """
+        Returns the index of gobj in the contents, or -1 if it is not a
+        child of this compound.  Every child carries a stacking key
+        <code>_z</code> that increases from back to front, so the index
+        is found by binary search.
+        """
+        if gobj is None or gobj._parent is not self:
+            return -1
+        contents = self._contents
+        z = gobj._z
+        lo = 0
+        hi = len(contents)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if contents[mid]._z < z:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(contents) and contents[lo] is gobj:
+            return lo
         return -1
 
 # Internal method: _remove_at
@@ -1471,11 +2437,53 @@ class GCompound(GObject):
         gobj = self._contents[index]
         self._contents.pop(index)
         gobj._parent = None
+        if self._spatial_index is not None:
+            self._spatial_index.remove(gobj)
+
+# Internal method: _restack
+
+    def _restack(self, index, count=1):
+        """
+        Moves the canvas items of the count children starting at the
+        specified index so that they sit just above the items of the
+        nearest earlier child that has any, or just below those of the
+        nearest later child.  Only the items of the moved children change
+        places in the display list.  The method returns
+        <code>False</code> if no other child of this compound has any
+        items to serve as an anchor.
+        """
+        gw = self._get_window()
+        if gw is None or gw._rebuild_pending:
+            return True
+        items = [ ]
+        for gobj in self._contents[index:index + count]:
+            gobj._collect_items(items)
+        if len(items) == 0:
+            return True
+        tkc = gw._canvas
+        for i in range(index - 1, -1, -1):
+            anchor = self._contents[i]._top_item()
+            if anchor is not None:
+                for tkid in items:
+                    tkc.tag_raise(tkid, anchor)
+                    anchor = tkid
+                return True
+        for i in range(index + count, len(self._contents)):
+            anchor = self._contents[i]._bottom_item()
+            if anchor is not None:
+                for tkid in reversed(items):
+                    tkc.tag_lower(tkid, anchor)
+                    anchor = tkid
+                return True
+        return False
 
 # Define camel-case names
 
+    addAll = add_all
     removeAll = remove_all
     getElementAt = get_element_at
+    setSpatialIndex = set_spatial_index
+    hasSpatialIndex = has_spatial_index
     getElementCount = get_element_count
     getElement = get_element
     getBounds = get_bounds
@@ -1500,6 +2508,8 @@ class GArc(GFillableObject):
     motion in a clockwise direction.
     """
 
+    __slots__ = ("_frame_width", "_frame_height", "_start", "_sweep", "_rep")
+
 # Constructor: GArc
 
     def __init__(self, a1, a2, a3=None, a4=None, a5=None, a6=None):
@@ -1543,7 +2553,8 @@ class GArc(GFillableObject):
         Sets the starting angle for this <code>GArc</code> object.
         """
         self._start = start
-        self._update_properties(start=start)
+        self._update_angles(start=start)
+        self._bounds_changed()
 
 # Public method: get_start_angle
 
@@ -1560,7 +2571,8 @@ class GArc(GFillableObject):
         Sets the sweep angle for this GArc object.
         """
         self._sweep = sweep
-        self._update_properties(extent=sweep)
+        self._update_angles(extent=sweep)
+        self._bounds_changed()
 
 # Public method: get_sweep_angle
 
@@ -1597,7 +2609,7 @@ class GArc(GFillableObject):
             x, y = x.get_x(), x.get_y()
         self.set_location(x, y)
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
         tkc = gw._canvas
         coords = tkc.coords(self._tkid)
@@ -1625,9 +2637,9 @@ class GArc(GFillableObject):
         the center.
         """
         GFillableObject.set_filled(self, flag)
-        style = tkinter.ARC
+        style = "arc"
         if flag:
-            style = tkinter.PIESLICE
+            style = "pieslice"
         self._update_properties(style=style)
 
 # Public method: get_bounds
@@ -1711,14 +2723,15 @@ class GArc(GFillableObject):
         """
         gw = target
         tkc = gw._canvas
+        self._begin_install(target, ctm)
         lctm = _GTransform(rotation=self._angle + ctm._rotation,
                            sf=self._sf * ctm._sf)
         p0 = ctm.transform(self._x, self._y)
         if lctm._rotation == 0:
             self._rep = "Arc"
-            style = tkinter.ARC
+            style = "arc"
             if self._fill_flag:
-                style = tkinter.PIESLICE
+                style = "pieslice"
             p1 = ctm.transform(self._x + self._frame_width,
                                self._y + self._frame_height)
             self._tkid = tkc.create_arc(p0._x, p0._y, p1._x, p1._y,
@@ -1752,6 +2765,7 @@ class GArc(GFillableObject):
 
     def set_filled(self, flag):
         GFillableObject.set_filled(self, flag)
+        self._bounds_changed()
         gw = self._get_window()
         if gw is not None:
             gw._rebuild()
@@ -1761,19 +2775,44 @@ class GArc(GFillableObject):
     def _update_rotation(self):
         """
         Updates the points for this <code>GArc</code> after a rotation.
+        An unrotated arc is drawn as an arc item and a rotated one as a
+        polygon or line, so the arc is reinstalled whenever the rotation
+        changes which kind of item is needed.
         """
         gw = self._get_window()
-        if gw is not None:
+        if gw is not None and self._tkid is not None:
             tkc = gw._canvas
             ctm = self._ctm_base
             lctm = _GTransform(rotation=self._angle + ctm._rotation,
                                sf=self._sf * ctm._sf)
+            if self._rep == "Arc" or lctm._rotation == 0:
+                if not gw._rebuild_pending:
+                    parent = self._parent
+                    self._uninstall(gw)
+                    parent._install_children(gw, parent._find_gobject(self), 1)
+                return
+            p0 = ctm.transform(self._x, self._y)
             coords = self._create_arc_coords(p0._x, p0._y,
                                              self._frame_width,
                                              self._frame_height,
                                              self._start, self._sweep,
                                              self._fill_flag, lctm)
             tkc.coords(self._tkid, *coords)
+            self._drawn_x = self._x
+            self._drawn_y = self._y
+
+# Private method: _update_angles
+
+    def _update_angles(self, **options):
+        """
+        Updates the canvas item after the start or sweep angle changes.
+        An arc item takes the new angle as an option, but a rotated arc
+        is drawn as a polygon or line whose points must be recomputed.
+        """
+        if self._tkid is not None and self._rep == "Polygon":
+            self._update_rotation()
+        else:
+            self._update_properties(**options)
 
 # Override method: _update_color
 
@@ -1802,16 +2841,13 @@ class GArc(GFillableObject):
         dth = sweep / n
         r1 = width / 2
         r2 = height / 2
-        coords = [ ]
-        for i in range(0, n + 1):
-            theta = math.radians(start + i * dth)
-            pt = ctm.transform(r1 + r1 * math.cos(theta),
-                               r2 - r2 * math.sin(theta))
-            coords.append(x + pt._x)
-            coords.append(y + pt._y)
+        thetas = [ math.radians(start + i * dth) for i in range(0, n + 1) ]
+        xs = [ r1 + r1 * math.cos(theta) for theta in thetas ]
+        ys = [ r2 - r2 * math.sin(theta) for theta in thetas ]
+        ctm = ctm.translate(x, y)
+        coords = ctm.transform_many(xs, ys)
         if fill:
-            pt = ctm.transform(r1, r2)
-            center = [ x + pt._x, y + pt._y ]
+            center = list(ctm.transform_xy(r1, r2))
             coords = center + coords[0:2] + coords + coords[-2:]
         return coords
         
@@ -1876,6 +2912,8 @@ class GLine(GObject):
     This graphical object subclass represents a line segment.
     """
 
+    __slots__ = ("_dx", "_dy")
+
 # Constructor: GLine
 
     def __init__(self, x0, y0, x1, y1):
@@ -1905,6 +2943,7 @@ class GLine(GObject):
         self._x = x
         self._y = y
         self._update_points()
+        self._bounds_changed()
 
 # Public method: get_start_point
 
@@ -1924,6 +2963,7 @@ class GLine(GObject):
         self._dx = x - self._x
         self._dy = y - self._y
         self._update_points()
+        self._bounds_changed()
 
 # Public method: get_end_point
 
@@ -1996,7 +3036,7 @@ class GLine(GObject):
         """
         gw = target
         tkc = gw._canvas
-        self._base_ctm = ctm
+        self._begin_install(target, ctm)
         p0 = ctm.transform(self._x, self._y)
         angle = ctm._rotation + self._angle
         ctm = _GTransform(rotation=angle, sf=ctm._sf)
@@ -2016,15 +3056,17 @@ class GLine(GObject):
         Updates the points in the <code>GLine</code>.
         """
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
         tkc = gw._canvas
-        ctm = self._base_ctm
+        ctm = self._ctm_base
         p0 = ctm.transform(self._x, self._y)
         angle = ctm._rotation + self._angle
         ctm = _GTransform(rotation=angle, sf=ctm._sf)
         dp = ctm.transform(self._dx, self._dy)
         tkc.coords(self._tkid, p0._x, p0._y, p0._x + dp._x, p0._y + dp._y)
+        self._drawn_x = self._x
+        self._drawn_y = self._y
 
 # Override method: _update_rotation
 
@@ -2049,6 +3091,11 @@ class GImage(GObject):
     This graphical object subclass represents an image from a file.
     """
 
+    DEFAULT_URL_CACHE_SIZE = 64 * 1024 * 1024
+
+    __slots__ = ("_source", "_image_model", "_image", "_photo", "_buffer",
+                 "_load_error")
+
     def __init__(self, source, x=0, y=0):
         """
         Initializes a new image by loading the image from the specified
@@ -2057,33 +3104,25 @@ class GImage(GObject):
         """
         GObject.__init__(self)
         self._source = source
-        self._image_model = _image_model
-        if _image_model == "PIL":
+        self._image_model = _get_image_model()
+        self._buffer = None
+        self._load_error = None
+        if self._image_model == "PIL":
             if isinstance(source, str):
                 if "://" in source:
-                    ctx = ssl.create_default_context()
-                    ctx.check_hostname = False
-                    ctx.verify_mode = ssl.CERT_NONE
-                    with urllib.request.urlopen(source, context=ctx) as req:
-                        self._image = Image.open(io.BytesIO(req.read()))
+                    self._image = _Image.open(io.BytesIO(_fetch_url(source)))
                 else:
-                    self._image = Image.open(source)
+                    self._image = _Image.open(source)
                 self._image.load()
+            elif _is_ndarray(source) and source.ndim == 3:
+                height, width = source.shape[:2]
+                self._set_buffer(source, width, height)
             else:
-                width = len(source[0])
                 height = len(source)
-                ba = bytearray(4 * width * height)
-                for i in range(height):
-                    for j in range(width):
-                        argb = source[i][j]
-                        base = 4 * (i * width + j)
-                        ba[base] = (argb >> 16) & 0xFF
-                        ba[base + 1] = (argb >> 8) & 0xFF
-                        ba[base + 2] = argb & 0xFF
-                        ba[base + 3] = (argb >> 24) & 0xFF
-                self._image = Image.frombytes("RGBA", (width, height),
-                                              bytes(ba))
-            self._photo = ImageTk.PhotoImage(self._image)
+                width = len(source[0])
+                self._set_buffer(_argb_to_rgba(source, width, height),
+                                 width, height)
+            self._photo = None
         else:
             if isinstance(source, str):
                 self._photo = tkinter.PhotoImage(file=source)
@@ -2100,8 +3139,20 @@ class GImage(GObject):
         Returns the bounding rectangle for this object
         """
         photo = self._photo
+        if photo is None:
+            return GRectangle(self._x, self._y,
+                              self._image.width, self._image.height)
         return GRectangle(self._x, self._y, photo.width(), photo.height())
 
+# Public method: get_load_error
+
+    def get_load_error(self):
+        """
+        Returns the exception that stopped an image requested with
+        <code>GWindow.load_image</code> from loading, or <code>None</code>.
+        """
+        return self._load_error
+
 # Public method: get_pixel_array
 
     def get_pixel_array(self):
@@ -2109,25 +3160,152 @@ class GImage(GObject):
         Returns a two-dimensional array of integers containing the pixel data.
         """
         if self._image_model == "PIL":
-            image = self._image
-            width = image.width
-            height = image.height
-        else:
-            width = self._photo.width()
-            height = self._photo.height()
+            image = self._image.convert("RGBA")
+            return _rgba_to_argb(image.tobytes(), image.width, image.height)
+        width = self._photo.width()
+        height = self._photo.height()
         pixels = height * [ [ 0 ] ]
         for y in range(height):
             pixels[y] = width * [ 0 ]
-        if self._image_model == "PIL":
-            data = image.convert("RGBA").getdata()
-            i = 0
-            for i in range(height):
-                for j in range(width):
-                    rgba = data[i * width + j]
-                    p = rgba[3] << 24 | rgba[0] << 16 | rgba[1] << 8 | rgba[2]
-                    pixels[i][j] = p
         return pixels
 
+# Public method: get_pixel_buffer
+
+    def get_pixel_buffer(self):
+        """
+        Returns the pixel data as a buffer of RGBA bytes, four per pixel in
+        row-major order.  If NumPy is available, the buffer is an array
+        with shape (height, width, 4); otherwise it is a
+        <code>memoryview</code>.  The buffer shares memory with the image,
+        so no per-pixel values are created.  Changes to the buffer appear
+        when the image is next drawn, after
+        <code>GWindow.clear_image_cache</code> has been called.
+        """
+        if self._image_model != "PIL":
+            raise ImportError("get_pixel_buffer requires the " +
+                              "Pillow library")
+        if self._buffer is None:
+            image = self._image.convert("RGBA")
+            data = bytearray(image.tobytes())
+            if _load_numpy() is not None:
+                data = _np.frombuffer(data, dtype=_np.uint8)
+                data = data.reshape(image.height, image.width, 4)
+            else:
+                data = memoryview(data)
+            self._set_buffer(data, image.width, image.height)
+        return self._buffer
+
+# Static method: from_buffer
+
+    @staticmethod
+    def from_buffer(buffer, width=None, height=None, x=0, y=0):
+        """
+        Creates a <code>GImage</code> that uses an existing buffer of RGBA
+        bytes as its pixel data without copying it.  The buffer is either
+        a NumPy array with shape (height, width, 4) or any bytes-like
+        object, in which case the width and height must be supplied.
+        A flat array is reshaped using whichever of the width and height
+        is given.
+        """
+        if _get_image_model() != "PIL":
+            raise ImportError("from_buffer requires the Pillow library")
+        if _is_ndarray(buffer):
+            if width is not None or height is not None:
+                buffer = buffer.reshape(-1 if height is None else height,
+                                        -1 if width is None else width, 4)
+            return GImage(buffer, x, y)
+        if width is None or height is None:
+            raise Exception("from_buffer: Width and height are required")
+        if len(memoryview(buffer).cast("B")) != 4 * width * height:
+            raise Exception("from_buffer: Buffer size does not match " +
+                            "the image size")
+        if _load_numpy() is not None:
+            data = _np.frombuffer(buffer, dtype=_np.uint8)
+            return GImage(data.reshape(height, width, 4), x, y)
+        gimage = GImage([ [ 0 ] ], x, y)
+        gimage._set_buffer(buffer, width, height)
+        gimage._source = buffer
+        return gimage
+
+# Static method: set_url_cache
+
+    @staticmethod
+    def set_url_cache(directory, max_bytes=None):
+        """
+        Sets the directory in which images loaded from URLs are kept so
+        that later loads read them from disk instead of the network.
+        When the files in the directory exceed max_bytes, the least
+        recently used ones are deleted.  A directory of <code>None</code>
+        turns the cache off.  By default, the cache is kept in
+        <code>~/.cache/pgl/images</code> and limited to
+        <code>DEFAULT_URL_CACHE_SIZE</code> bytes.
+        """
+        global _url_cache
+        if max_bytes is None:
+            max_bytes = GImage.DEFAULT_URL_CACHE_SIZE
+        if directory is None:
+            _url_cache = False
+        else:
+            _url_cache = _GDiskCache(directory, max_bytes)
+
+# Static method: clear_url_cache
+
+    @staticmethod
+    def clear_url_cache():
+        """
+        Deletes every image in the URL cache.
+        """
+        cache = _get_url_cache()
+        if cache is not None:
+            cache.clear()
+
+# Private static method: _create_placeholder
+
+    @staticmethod
+    def _create_placeholder(url, x, y):
+        """
+        Returns a transparent one-pixel <code>GImage</code> that stands
+        in for the image at url until it is loaded.
+        """
+        if _get_image_model() != "PIL":
+            raise ImportError("load_image requires the Pillow library")
+        gimage = GImage([ [ 0 ] ], x, y)
+        gimage._source = url
+        return gimage
+
+# Private method: _set_image
+
+    def _set_image(self, image):
+        """
+        Replaces the PIL image displayed by this <code>GImage</code>.  If
+        the image is on the screen, its canvas item is updated in place,
+        so it keeps its position in the stacking order.
+        """
+        self._image = image
+        self._buffer = None
+        self._bounds_changed()
+        gw = self._get_window()
+        if gw is not None and self._tkid is not None:
+            ctm = self._ctm_base
+            photo, dx, dy = self._get_photo(gw, ctm)
+            pt = ctm.transform(self._drawn_x, self._drawn_y)
+            tkc = gw._canvas
+            tkc.itemconfig(self._tkid, image=photo)
+            tkc.coords(self._tkid, pt._x + dx, pt._y + dy)
+
+# Private method: _set_buffer
+
+    def _set_buffer(self, buffer, width, height):
+        """
+        Makes the image a view of the RGBA bytes in buffer.
+        """
+        self._buffer = buffer
+        if _is_ndarray(buffer):
+            buffer = _np.ascontiguousarray(buffer, dtype=_np.uint8)
+            self._buffer = buffer
+        self._image = _Image.frombuffer("RGBA", (width, height), buffer,
+                                       "raw", "RGBA", 0, 1)
+
 # Override method: scale
 
     def scale(self, sf):
@@ -2140,6 +3318,7 @@ class GImage(GObject):
         gw = self._get_window()
         if gw is not None:
             gw._rebuild()
+        self._bounds_changed()
 
 # Override method: get_type
 
@@ -2157,38 +3336,70 @@ class GImage(GObject):
         """
         gw = target
         tkc = gw._canvas
+        self._begin_install(target, ctm)
         pt = ctm.transform(self._x, self._y)
         x = pt._x
         y = pt._y
+        if self._image_model == "PIL":
+            photo, dx, dy = self._get_photo(gw, ctm)
+            x += dx
+            y += dy
+        self._tkid = tkc.create_image(x, y,
+                                      anchor="nw",
+                                      image=self._photo)
+
+# Private method: _get_photo
+
+    def _get_photo(self, gw, ctm):
+        """
+        Sets the photo used to draw this image inside a compound with the
+        transformation ctm, taking it from the image cache if possible,
+        and returns it together with the offset of its upper left corner.
+        """
         ctm = ctm.compose(_GTransform(rotation=self._angle, sf=self._sf))
-        img = self._image
         rotation = ctm._rotation % 360
-        if ctm._sf != 1:
-            w = round(img.width * ctm._sf)
-            h = round(img.height * ctm._sf)
-            img = img.resize((w, h), Image.ANTIALIAS)
+        cache = gw._image_cache
+        entry = cache.lookup(self._image, ctm._sf, rotation)
+        if entry is None:
+            entry = self._create_photo(gw, ctm._sf, rotation)
+            cache.store(self._image, ctm._sf, rotation, entry)
+        self._photo = entry[0]
+        return entry
+
+# Private method: _create_photo
+
+    def _create_photo(self, gw, sf, rotation):
+        """
+        Resamples the image for the given scale factor and rotation and
+        returns a tuple of the displayable photo and the offset from the
+        reference point to the upper left corner of the rotated image.
+        """
+        img = self._image
+        dx = 0
+        dy = 0
+        if sf != 1:
+            w = round(img.width * sf)
+            h = round(img.height * sf)
+            img = img.resize((w, h), _Image.LANCZOS)
         if rotation != 0:
-            w = img.width 
+            w = img.width
             h = img.height
             img = img.rotate(rotation, expand=True)
             if rotation > 0 and rotation <= 90:
                 theta = math.radians(rotation)
-                y -= w * math.sin(theta)
+                dy -= w * math.sin(theta)
             elif rotation > 90 and rotation <= 180:
                 theta = math.radians(rotation - 90)
-                x -= w * math.sin(theta)
-                y -= h * math.sin(theta) + w * math.cos(theta)
+                dx -= w * math.sin(theta)
+                dy -= h * math.sin(theta) + w * math.cos(theta)
             elif rotation > 180 and rotation <= 270:
                 theta = math.radians(rotation - 180)
-                x -= h * math.sin(theta) + w * math.cos(theta)
-                y -= h * math.cos(theta)
+                dx -= h * math.sin(theta) + w * math.cos(theta)
+                dy -= h * math.cos(theta)
             else:
                 theta = math.radians(rotation - 270)
-                x -= h * math.cos(theta)            
-        self._photo = ImageTk.PhotoImage(img)
-        self._tkid = tkc.create_image(x, y,
-                                      anchor=tkinter.NW,
-                                      image=self._photo)
+                dx -= h * math.cos(theta)
+        return (gw._create_photo(img), dx, dy)
 
 # Override method: _update_rotation
 
@@ -2276,6 +3487,8 @@ class GImage(GObject):
 
     getBounds = get_bounds
     getPixelArray = get_pixel_array
+    getPixelBuffer = get_pixel_buffer
+    fromBuffer = from_buffer
     getType = get_type
     getRed = get_red
     getGreen = get_green
@@ -2290,6 +3503,9 @@ class GLabel(GObject):
     This graphical object subclass represents a text string.
     """
 
+    __slots__ = ("_text", "_font", "_font_info", "_tk_font",
+                 "_baseline_offset")
+
 # Constants
 
     DEFAULT_FONT = "13pt 'Helvetica Neue','Helvetica','Arial','Sans-Serif'"
@@ -2305,7 +3521,9 @@ class GLabel(GObject):
         GObject.__init__(self)
         self._text = text
         self._font = self.DEFAULT_FONT
-        self._tk_font = _decode_font(self._font)
+        self._font_info = _get_font_info(self._font)
+        self._tk_font = self._font_info.font
+        self._baseline_offset = None
         self.set_location(x, y)
 
 # Public method: set_font
@@ -2317,9 +3535,12 @@ class GLabel(GObject):
         where both <code>style</code> and <code>size</code> are optional.
         """
         self._font = font
-        self._tk_font = _decode_font(self._font)
+        self._font_info = _get_font_info(self._font)
+        self._tk_font = self._font_info.font
+        self._baseline_offset = None
         self._update_properties(font=self._tk_font)
         self._update_location()
+        self._bounds_changed()
 
 # Public method: get_font
 
@@ -2338,6 +3559,7 @@ class GLabel(GObject):
         """
         self._text = text
         self._update_properties(text=text)
+        self._bounds_changed()
 
 # Public method: get_label
 
@@ -2354,7 +3576,7 @@ class GLabel(GObject):
         Returns the maximum distance strings in this font extend above
         the baseline.
         """
-        return self._tk_font.metrics("ascent")
+        return self._font_info.ascent
 
 # Public method: get_descent
 
@@ -2363,7 +3585,7 @@ class GLabel(GObject):
         Returns the maximum distance strings in this font descend below
         the baseline.
         """
-        return self._tk_font.metrics("descent")
+        return self._font_info.descent
 
 # Override method: get_width
 
@@ -2371,7 +3593,7 @@ class GLabel(GObject):
         """
         Returns the width for this <code>GLabel</code>.
         """
-        return self._tk_font.measure(self._text)
+        return self._font_info.measure(self._text)
 
 # Override method: get_height
 
@@ -2379,7 +3601,7 @@ class GLabel(GObject):
         """
         Returns the height for this <code>GLabel</code>.
         """
-        return self._tk_font.metrics("linespace")
+        return self._font_info.linespace
 
 # Override method: get_bounds
 
@@ -2407,20 +3629,12 @@ class GLabel(GObject):
         baseline.
         """
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        offx = 0
-        offy = self.get_height() - self.get_ascent()
-        gobj = self.get_parent()
-        while gobj is not None:
-            offx += gobj._x
-            offy += gobj._y
-            gobj = gobj.get_parent()
-        dx = (self._x + offx) - coords[0]
-        dy = (self._y + offy) - coords[1]
-        tkc.move(self._tkid, dx, dy)
+        if gw._batch_depth > 0:
+            gw._dirty_locations[id(self)] = self
+            return
+        self._move_drawn(gw, self._x, self._y + self._get_baseline_offset())
 
 # Override method: _install
 
@@ -2430,11 +3644,13 @@ class GLabel(GObject):
         """
         gw = target
         tkc = gw._canvas
-        self._ctm_base = ctm
+        offset = self._get_baseline_offset()
+        self._begin_install(target, ctm)
+        self._drawn_y = self._y + offset
         pt = ctm.transform(self._x, self._y)
         dtm = _GTransform(rotation=self._angle, sf=self._sf)
         ctm = ctm.compose(dtm)
-        dp = dtm.transform(0, self.get_height() - self.get_ascent())
+        dp = dtm.transform(0, offset)
         x = pt._x + dp._x
         y = pt._y + dp._y
         baseline = y;
@@ -2470,6 +3686,18 @@ class GLabel(GObject):
         ctm = ctm.compose(_GTransform(rotation=self._angle, sf=self._sf))
         self._update_properties(angle=ctm.get_rotation())
 
+# Private method: _get_baseline_offset
+
+    def _get_baseline_offset(self):
+        """
+        Returns the distance from the stored y coordinate to the bottom of
+        the text, where the canvas item is anchored.  The value depends
+        only on the font, so it is computed once per font.
+        """
+        if self._baseline_offset is None:
+            self._baseline_offset = self.get_height() - self.get_ascent()
+        return self._baseline_offset
+
 # Override method: __str__
 
     def __str__(self):
@@ -2499,6 +3727,8 @@ class GPolygon(GFillableObject):
     <code>add_edge</code>, and <code>add_polar_edge</code>.
     """
 
+    __slots__ = ("_vertices", "_cx", "_cy", "_local_bounds")
+
 # Constructor: GPolygon
 
     def __init__(self):
@@ -2509,6 +3739,7 @@ class GPolygon(GFillableObject):
         self._cx = None
         self._cy = None
         self._vertices = [ ]
+        self._local_bounds = None
 
 # Public method: add_vertex
 
@@ -2520,6 +3751,8 @@ class GPolygon(GFillableObject):
         self._cx = x
         self._cy = y
         self._vertices.append(GPoint(x, y))
+        self._local_bounds = None
+        self._bounds_changed()
 
 # Public method: add_edge
 
@@ -2555,26 +3788,12 @@ class GPolygon(GFillableObject):
 
     def get_bounds(self):
         """
-        Returns the bounding rectangle for this object.
+        Returns the bounding rectangle for this object.  The extent of
+        the vertices is cached until another vertex is added.
         """
-        x_min = 0
-        y_min = 0
-        x_max = 0
-        y_max = 0
-        for i in range(len(self._vertices)):
-            x = self._vertices[i]._x
-            y = self._vertices[i]._y
-            if i == 0 or x < x_min:
-                x_min = x
-            if i == 0 or y < y_min:
-                y_min = y
-            if i == 0 or x > x_max:
-                x_max = x
-            if i == 0 or y > y_max:
-                y_max = y
-        x0 = self._x
-        y0 = self._y
-        return GRectangle(x0 + x_min, y0 + y_min, x_max - x_min, y_max - y_min)
+        x_min, y_min, x_max, y_max = self._get_local_bounds()
+        return GRectangle(self._x + x_min, self._y + y_min,
+                          x_max - x_min, y_max - y_min)
 
 # Public method: contains
 
@@ -2588,6 +3807,9 @@ class GPolygon(GFillableObject):
         n = len(self._vertices)
         if n < 2:
             return False
+        x_min, y_min, x_max, y_max = self._get_local_bounds()
+        if tx < x_min or tx > x_max or ty < y_min or ty > y_max:
+            return False
         if self._vertices[0] == self._vertices[n - 1]:
             n = n - 1
         x0 = self._vertices[0]._x
@@ -2617,16 +3839,12 @@ class GPolygon(GFillableObject):
         Updates the location for this object from the stored x and y values.
         """
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        oldx = coords[0]
-        oldy = coords[1]
-        coords = self._create_coords()
-        dx = oldx - coords[0]
-        dy = oldy - coords[1]
-        tkc.move(self._tkid, dx, dy)
+        if gw._batch_depth > 0:
+            gw._dirty_locations[id(self)] = self
+            return
+        self._move_drawn(gw, self._x, self._y)
 
 # Override method: _update_rotation
 
@@ -2635,11 +3853,13 @@ class GPolygon(GFillableObject):
         Updates this <code>GPolygon</code> after a rotation.
         """
         gw = self._get_window()
-        if gw is None:
+        if gw is None or self._tkid is None:
             return
         tkc = gw._canvas
         coords = self._create_coords()
         tkc.coords(self._tkid, *coords)
+        self._drawn_x = self._x
+        self._drawn_y = self._y
 
 # Override method: _install
 
@@ -2649,7 +3869,7 @@ class GPolygon(GFillableObject):
         """
         gw = target
         tkc = gw._canvas
-        self._ctm_base = ctm
+        self._begin_install(target, ctm)
         coords = self._create_coords()
         self._tkid = tkc.create_polygon(*coords, width=self._line_width)
         self._update_color()
@@ -2659,18 +3879,32 @@ class GPolygon(GFillableObject):
     def __str__(self):
         return "GPolygon(" + str(len(self._vertices)) + " vertices)"
 
+# Private method: _get_local_bounds
+
+    def _get_local_bounds(self):
+        """
+        Returns the extent of the vertices relative to the origin of the
+        polygon as a tuple (x_min, y_min, x_max, y_max).
+        """
+        bounds = self._local_bounds
+        if bounds is None:
+            if len(self._vertices) == 0:
+                bounds = (0, 0, 0, 0)
+            else:
+                xs = [ pt._x for pt in self._vertices ]
+                ys = [ pt._y for pt in self._vertices ]
+                bounds = (min(xs), min(ys), max(xs), max(ys))
+            self._local_bounds = bounds
+        return bounds
+
 # Private method: _create_coords
 
     def _create_coords(self):
         ctm = self._ctm_base
         ctm = ctm.compose(_GTransform(self._x, self._y,
                                       rotation=self._angle, sf=self._sf))
-        coords = [ ]
-        for pt in self._vertices:
-            tp = ctm.transform(pt)
-            coords.append(tp._x)
-            coords.append(tp._y)
-        return coords
+        return ctm.transform_many([ pt._x for pt in self._vertices ],
+                                  [ pt._y for pt in self._vertices ])
 
 # Define camel-case names
 
@@ -2681,110 +3915,564 @@ class GPolygon(GFillableObject):
     getBounds = get_bounds
     getType = get_type
 
-# Class: GPoint
+# Class: GShapeBatch
 
-class GPoint:
+class GShapeBatch(GObject):
     """
-    This class contains real-valued x and y fields. It is used to represent
-    a location on the graphics plane.
+    This graphical object subclass represents a large number of
+    rectangles or ovals that are stored together in NumPy arrays instead
+    of as individual objects.  The position, size, color, and visibility
+    of every shape can be changed in bulk, hit testing is vectorized, and
+    only the shapes that actually changed are sent to the canvas.  Shape
+    coordinates are relative to the location of the batch, and each
+    shape has an index, with higher indices drawn in front.
     """
 
-# Constructor: GPoint
+    __slots__ = ("_kind", "_filled", "_xs", "_ys", "_widths", "_heights",
+                 "_color_index", "_shown", "_palette", "_palette_index",
+                 "_tkids", "_dirty", "_style_dirty")
 
-    def __init__(self, x=0, y=0):
-        """Initializes a point with the specified coordinates."""
-        self._x = x
-        self._y = y
+# Constructor: GShapeBatch
 
-# Public method: get_x
+    def __init__(self, xs, ys, widths, heights, kind="rect",
+                 color="Black", filled=True):
+        """
+        Creates a batch of shapes from parallel sequences of coordinates
+        and sizes.  The <code>kind</code> parameter is either
+        <code>"rect"</code> or <code>"oval"</code>.  Every shape starts
+        out visible and in the specified color, which fills it unless
+        <code>filled</code> is <code>False</code>.
+        """
+        if _load_numpy() is None:
+            raise ImportError("GShapeBatch requires the NumPy library")
+        if kind not in ("rect", "oval"):
+            raise Exception("GShapeBatch: Illegal kind - " + str(kind))
+        GObject.__init__(self)
+        self._kind = kind
+        self._filled = filled
+        self._xs = _np.array(xs, dtype=float)
+        self._ys = _np.array(ys, dtype=float)
+        n = len(self._xs)
+        self._widths = _np.broadcast_to(_np.asarray(widths, dtype=float),
+                                       (n,)).copy()
+        self._heights = _np.broadcast_to(_np.asarray(heights, dtype=float),
+                                        (n,)).copy()
+        self._color = _resolve_color(color)
+        self._palette = [ self._color ]
+        self._palette_index = { self._color: 0 }
+        self._color_index = _np.zeros(n, dtype=_np.int32)
+        self._shown = _np.ones(n, dtype=bool)
+        self._tkids = [ ]
+        self._dirty = _np.zeros(n, dtype=bool)
+        self._style_dirty = _np.zeros(n, dtype=bool)
 
-    def get_x(self):
-        """Returns the x component of the point."""
-        return self._x
+# Public method: get_count
 
-# Public method: get_y
+    def get_count(self):
+        """
+        Returns the number of shapes in the batch.
+        """
+        return len(self._xs)
 
-    def get_y(self):
-        """Returns the y component of the point."""
-        return self._y
+    def __len__(self):
+        return len(self._xs)
 
-# Public method: __str__
+# Public method: get_kind
 
-    def __str__(self):
-        """Returns the string representation of a point."""
-        return "(" + str(self._x) + ", " + str(self._y) + ")"
+    def get_kind(self):
+        """
+        Returns <code>"rect"</code> or <code>"oval"</code>.
+        """
+        return self._kind
 
-# Public method: __eq__
+# Public method: set_positions
 
-    def __eq__(self, other):
-        """Returns a Boolean indicating whether two points are equal."""
-        if isinstance(other, GPoint):
-            return self._x == other._x and self._y == other._y
-        return False
+    def set_positions(self, xs, ys, indices=None):
+        """
+        Moves shapes so that their upper left corners are at the points
+        given by the arrays <code>xs</code> and <code>ys</code>.  If
+        <code>indices</code> is supplied, only those shapes move and the
+        arrays give their new positions in the same order.
+        """
+        if indices is None:
+            indices = slice(None)
+        xs = _np.asarray(xs, dtype=float)
+        ys = _np.asarray(ys, dtype=float)
+        changed = (self._xs[indices] != xs) | (self._ys[indices] != ys)
+        self._xs[indices] = xs
+        self._ys[indices] = ys
+        self._dirty[indices] |= changed
+        self._changed()
 
-# Define camel-case names
+# Public method: get_positions
 
-    getX = get_x
-    getY = get_y
+    def get_positions(self):
+        """
+        Returns copies of the x and y coordinate arrays.
+        """
+        return self._xs.copy(), self._ys.copy()
 
-# Class: GDimension
+# Public method: set_sizes
 
-class GDimension:
-    """
-    This class contains real-valued witdth and height fields.  It is
-    used to indicate the size of a graphical object.
-    """
+    def set_sizes(self, widths, heights, indices=None):
+        """
+        Changes the widths and heights of shapes, optionally only those
+        selected by <code>indices</code>.
+        """
+        if indices is None:
+            indices = slice(None)
+        widths = _np.asarray(widths, dtype=float)
+        heights = _np.asarray(heights, dtype=float)
+        changed = (self._widths[indices] != widths) | \
+                  (self._heights[indices] != heights)
+        self._widths[indices] = widths
+        self._heights[indices] = heights
+        self._dirty[indices] |= changed
+        self._changed()
 
-# Constructor: GDimension
+# Public method: get_sizes
 
-    def __init__(self, width=0.0, height=0.0):
+    def get_sizes(self):
         """
-        Initializes a <code>GDimension</code> object with the specified size.
+        Returns copies of the width and height arrays.
         """
-        self._width = width
-        self._height = height
+        return self._widths.copy(), self._heights.copy()
 
-# Public method: get_width
+# Public method: set_colors
 
-    def get_width(self):
+    def set_colors(self, colors, indices=None):
         """
-        Returns the width component of the <code>GDimension</code>.
+        Sets the colors of shapes.  The colors parameter is either a
+        single color, which applies to every selected shape, or a
+        sequence with one color per selected shape.  Colors take any
+        form accepted by <code>set_color</code>.
         """
-        return self._width
+        if indices is None:
+            indices = slice(None)
+        if isinstance(colors, (str, int)):
+            index = self._get_palette_index(colors)
+        else:
+            index = _np.array([ self._get_palette_index(color)
+                               for color in colors ], dtype=_np.int32)
+        changed = self._color_index[indices] != index
+        self._color_index[indices] = index
+        self._style_dirty[indices] |= changed
+        self._changed()
 
-# Public method: get_height
+# Public method: get_shape_color
 
-    def get_height(self):
+    def get_shape_color(self, index):
         """
-        Returns the height component of the <code>GDimension</code>.
+        Returns the color of one shape in the form <code>"#rrggbb"</code>.
         """
-        return self._height
+        return self._palette[self._color_index[index]]
 
-# Public method: __str__
+# Public method: set_shapes_visible
 
-    def __str__(self):
-        return "(" + str(self._width) + ", " + str(self._height) + ")"
+    def set_shapes_visible(self, flags, indices=None):
+        """
+        Shows or hides shapes.  The flags parameter is either a single
+        boolean or an array with one value per selected shape.  Hidden
+        shapes keep their canvas items and are ignored by hit tests.
+        """
+        if indices is None:
+            indices = slice(None)
+        flags = _np.asarray(flags, dtype=bool)
+        changed = self._shown[indices] != flags
+        self._shown[indices] = flags
+        self._style_dirty[indices] |= changed
+        self._changed()
 
-# Public method: __eq__
+# Public method: get_visible_mask
 
-    def __eq__(self, other):
-        if isinstance(other, GDimension):
-            return (self._width == other._width and
-                    self._height == other._height)
-        return False
+    def get_visible_mask(self):
+        """
+        Returns a copy of the array recording which shapes are visible.
+        """
+        return self._shown.copy()
 
-# Define camel-case names
+# Public method: find_shape_at
 
-    getWidth = get_width
-    getHeight = get_height
+    def find_shape_at(self, x, y):
+        """
+        Returns the index of the frontmost visible shape containing the
+        point (x, y), or -1 if there is none.  The coordinates are in the
+        same system as the location of the batch.
+        """
+        if not self._visible:
+            return -1
+        px = x - self._x
+        py = y - self._y
+        xs = self._xs
+        ys = self._ys
+        if self._kind == "rect":
+            hits = (px >= xs) & (px <= xs + self._widths) & \
+                   (py >= ys) & (py <= ys + self._heights)
+        else:
+            rx = self._widths / 2
+            ry = self._heights / 2
+            with _np.errstate(divide="ignore", invalid="ignore"):
+                dx = (px - xs - rx) / rx
+                dy = (py - ys - ry) / ry
+                hits = dx * dx + dy * dy <= 1.0
+        indices = _np.flatnonzero(hits & self._shown)
+        if len(indices) == 0:
+            return -1
+        return int(indices[-1])
+
+# Public method: find_shapes_in
+
+    def find_shapes_in(self, x, y, width, height):
+        """
+        Returns an array of the indices of visible shapes whose bounding
+        boxes overlap the specified rectangle.
+        """
+        x0 = x - self._x
+        y0 = y - self._y
+        hits = (self._xs <= x0 + width) & \
+               (self._xs + self._widths >= x0) & \
+               (self._ys <= y0 + height) & \
+               (self._ys + self._heights >= y0)
+        return _np.flatnonzero(hits & self._shown)
 
-# Class: GRectangle
+# Override method: contains
 
-class GRectangle:
-    """
-    This type contains real-valued x, y, width, and height fields. It is
-    used to represent the bounding box of a graphical object.
-    """
+    def contains(self, x, y):
+        """
+        Returns true if the specified point is inside a visible shape.
+        """
+        return self.find_shape_at(x, y) != -1
+
+# Override method: get_bounds
+
+    def get_bounds(self):
+        """
+        Returns the bounding rectangle of the visible shapes.
+        """
+        shown = self._shown
+        if not shown.any():
+            return GRectangle(self._x, self._y, 0, 0)
+        xs = self._xs[shown]
+        ys = self._ys[shown]
+        x0 = float(xs.min())
+        y0 = float(ys.min())
+        x1 = float((xs + self._widths[shown]).max())
+        y1 = float((ys + self._heights[shown]).max())
+        return GRectangle(self._x + x0, self._y + y0, x1 - x0, y1 - y0)
+
+# Override method: get_type
+
+    def get_type(self):
+        """
+        Returns the type of this object.
+        """
+        return "GShapeBatch"
+
+# Override method: __str__
+
+    def __str__(self):
+        return "GShapeBatch(" + str(len(self._xs)) + " " + self._kind + \
+               "s)"
+
+# Override method: _install
+
+    def _install(self, target, ctm):
+        """
+        Installs the shapes in the canvas.  Every shape gets its own
+        canvas item, and all of them carry a tag unique to the batch,
+        which serves as the <code>_tkid</code> of the batch so that
+        moving the batch or changing its line width is a single canvas
+        call.
+        """
+        gw = target
+        tkc = gw._canvas
+        self._begin_install(target, ctm)
+        tag = "batch" + str(id(self))
+        if self._kind == "rect":
+            create = tkc.create_rectangle
+        else:
+            create = tkc.create_oval
+        x0, y0, x1, y1 = self._get_canvas_coords(slice(None))
+        tkids = [ ]
+        for i in range(len(self._xs)):
+            fill, outline, state = self._get_style(i)
+            tkids.append(create(x0[i], y0[i], x1[i], y1[i], fill=fill,
+                                outline=outline, state=state,
+                                width=self._line_width, tags=tag))
+        self._tkids = tkids
+        self._tkid = tag
+        self._dirty[:] = False
+        self._style_dirty[:] = False
+
+# Override method: _release_items
+
+    def _release_items(self, items):
+        items.extend(self._tkids)
+        self._tkids = [ ]
+        self._tkid = None
+        self._window = None
+
+# Override method: _collect_items
+
+    def _collect_items(self, items):
+        items.extend(self._tkids)
+
+# Override method: _register_items
+
+    def _register_items(self, table):
+        for tkid in self._tkids:
+            table[tkid] = self
+
+# Override method: _bottom_item
+
+    def _bottom_item(self):
+        if len(self._tkids) == 0:
+            return None
+        return self._tkids[0]
+
+# Override method: _top_item
+
+    def _top_item(self):
+        if len(self._tkids) == 0:
+            return None
+        return self._tkids[-1]
+
+# Override method: _update_location
+
+    def _update_location(self):
+        """
+        Moves the whole batch by the change in its location with one
+        canvas call and then sends the shapes that changed on their own.
+        """
+        gw = self._get_window()
+        if gw is None or self._tkid is None:
+            return
+        if gw._batch_depth > 0:
+            gw._dirty_locations[id(self)] = self
+            return
+        self._move_drawn(gw, self._x, self._y)
+        self._push_changes(gw)
+
+# Override method: _update_color
+
+    def _update_color(self):
+        """
+        Gives every shape the color of the batch.
+        """
+        self.set_colors(self._color)
+
+# Override method: _update_visible
+
+    def _update_visible(self):
+        """
+        Shows or hides every shape without losing which shapes were
+        hidden individually.
+        """
+        self._style_dirty[:] = True
+        self._changed()
+
+# Private method: _changed
+
+    def _changed(self):
+        """
+        Records that shapes changed and updates the canvas, or defers the
+        update to the end of the current <code>GWindow.batch</code>.
+        """
+        self._bounds_changed()
+        self._update_location()
+
+# Private method: _push_changes
+
+    def _push_changes(self, gw):
+        """
+        Sends the coordinates of moved or resized shapes and the options
+        of restyled shapes to the canvas.
+        """
+        tkc = gw._canvas
+        tkids = self._tkids
+        if self._dirty.any():
+            indices = _np.flatnonzero(self._dirty)
+            self._dirty[:] = False
+            x0, y0, x1, y1 = self._get_canvas_coords(indices)
+            for i, a, b, c, d in zip(indices.tolist(), x0.tolist(),
+                                     y0.tolist(), x1.tolist(), y1.tolist()):
+                tkc.coords(tkids[i], a, b, c, d)
+        if self._style_dirty.any():
+            indices = _np.flatnonzero(self._style_dirty)
+            self._style_dirty[:] = False
+            for i in indices.tolist():
+                fill, outline, state = self._get_style(i)
+                tkc.itemconfig(tkids[i], fill=fill, outline=outline,
+                               state=state)
+
+# Private method: _get_canvas_coords
+
+    def _get_canvas_coords(self, indices):
+        """
+        Returns arrays of canvas coordinates for the corners of the
+        selected shapes.  The batch is drawn at its last drawn location,
+        since a change in location is applied separately by moving the
+        whole batch.  Rotation does not apply to a batch.
+        """
+        ctm = self._ctm_base
+        sf = ctm._sf
+        x0 = ctm._tx + sf * (self._drawn_x + self._xs[indices])
+        y0 = ctm._ty + sf * (self._drawn_y + self._ys[indices])
+        x1 = x0 + sf * self._widths[indices]
+        y1 = y0 + sf * self._heights[indices]
+        return x0, y0, x1, y1
+
+# Private method: _get_style
+
+    def _get_style(self, i):
+        """
+        Returns the fill, outline, and state options for shape i.
+        """
+        color = self._palette[self._color_index[i]]
+        if self._visible and self._shown[i]:
+            state = "normal"
+        else:
+            state = "hidden"
+        if self._filled:
+            return color, color, state
+        return "", color, state
+
+# Private method: _get_palette_index
+
+    def _get_palette_index(self, color):
+        color = _resolve_color(color)
+        index = self._palette_index.get(color)
+        if index is None:
+            index = len(self._palette)
+            self._palette.append(color)
+            self._palette_index[color] = index
+        return index
+
+# Define camel-case names
+
+    getCount = get_count
+    getKind = get_kind
+    setPositions = set_positions
+    getPositions = get_positions
+    setSizes = set_sizes
+    getSizes = get_sizes
+    setColors = set_colors
+    getShapeColor = get_shape_color
+    setShapesVisible = set_shapes_visible
+    getVisibleMask = get_visible_mask
+    findShapeAt = find_shape_at
+    findShapesIn = find_shapes_in
+
+# Class: GPoint
+
+class GPoint:
+    """
+    This class contains real-valued x and y fields. It is used to represent
+    a location on the graphics plane.
+    """
+
+    __slots__ = ("_x", "_y")
+
+# Constructor: GPoint
+
+    def __init__(self, x=0, y=0):
+        """Initializes a point with the specified coordinates."""
+        self._x = x
+        self._y = y
+
+# Public method: get_x
+
+    def get_x(self):
+        """Returns the x component of the point."""
+        return self._x
+
+# Public method: get_y
+
+    def get_y(self):
+        """Returns the y component of the point."""
+        return self._y
+
+# Public method: __str__
+
+    def __str__(self):
+        """Returns the string representation of a point."""
+        return "(" + str(self._x) + ", " + str(self._y) + ")"
+
+# Public method: __eq__
+
+    def __eq__(self, other):
+        """Returns a Boolean indicating whether two points are equal."""
+        if isinstance(other, GPoint):
+            return self._x == other._x and self._y == other._y
+        return False
+
+# Define camel-case names
+
+    getX = get_x
+    getY = get_y
+
+# Class: GDimension
+
+class GDimension:
+    """
+    This class contains real-valued witdth and height fields.  It is
+    used to indicate the size of a graphical object.
+    """
+
+    __slots__ = ("_width", "_height")
+
+# Constructor: GDimension
+
+    def __init__(self, width=0.0, height=0.0):
+        """
+        Initializes a <code>GDimension</code> object with the specified size.
+        """
+        self._width = width
+        self._height = height
+
+# Public method: get_width
+
+    def get_width(self):
+        """
+        Returns the width component of the <code>GDimension</code>.
+        """
+        return self._width
+
+# Public method: get_height
+
+    def get_height(self):
+        """
+        Returns the height component of the <code>GDimension</code>.
+        """
+        return self._height
+
+# Public method: __str__
+
+    def __str__(self):
+        return "(" + str(self._width) + ", " + str(self._height) + ")"
+
+# Public method: __eq__
+
+    def __eq__(self, other):
+        if isinstance(other, GDimension):
+            return (self._width == other._width and
+                    self._height == other._height)
+        return False
+
+# Define camel-case names
+
+    getWidth = get_width
+    getHeight = get_height
+
+# Class: GRectangle
+
+class GRectangle:
+    """
+    This type contains real-valued x, y, width, and height fields. It is
+    used to represent the bounding box of a graphical object.
+    """
+
+    __slots__ = ("_x", "_y", "_width", "_height")
 
 # Constructor: GRectangle
 
@@ -2896,8 +4584,7 @@ class GTimer:
         self._fn = fn
         self._delay = delay
         self._repeats = False
-        self._after_id = None
-        gw._timers.append(self)
+        self._entry = None
 
 # Public method: set_repeats
 
@@ -2911,10 +4598,13 @@ class GTimer:
 
     def start(self):
         """
-        Starts the timer.
+        Starts the timer.  Starting a timer that is already running
+        restarts it from the beginning of its delay.
         """
-        tkc = self._gw._canvas
-        self._after_id = tkc.after(self._delay, self._timer_ticked)
+        self.stop()
+        queue = self._gw._timer_queue
+        self._entry = queue.schedule(self._gw._get_time() + self._delay,
+                                     self._timer_ticked)
 
 # Public method: stop
 
@@ -2922,18 +4612,444 @@ class GTimer:
         """
         Stops the timer.
         """
-        if self._after_id is not None:
-            tkc = self._gw._canvas
-            tkc.after_cancel(self._after_id)
-            self._after_id = None
+        if self._entry is not None:
+            self._gw._timer_queue.cancel(self._entry)
+            self._entry = None
+
+# Public method: is_running
+
+    def is_running(self):
+        """
+        Returns <code>True</code> if the timer is waiting to fire.
+        """
+        return self._entry is not None
 
 # Private method: _timer_ticked
 
     def _timer_ticked(self):
+        """
+        Calls the timer function.  An interval timer is rescheduled
+        first, one delay after the time it was due, so that the function
+        can stop it and so that the time the function takes does not
+        accumulate.  If the timer has fallen a whole delay behind, the
+        next tick is measured from the current time instead.
+        """
+        due = self._entry[0]
+        self._entry = None
+        if self._repeats:
+            gw = self._gw
+            due = max(due + self._delay, gw._get_time())
+            self._entry = gw._timer_queue.schedule(due, self._timer_ticked)
         self._fn()
-        if self._repeats and self._after_id is not None:
-            tkc = self._gw._canvas
-            self._after_id = tkc.after(self._delay, self._timer_ticked)
+
+# Define camel-case names
+
+    setRepeats = set_repeats
+    isRunning = is_running
+
+# Class: GFrameLoop
+
+class GFrameLoop:
+    """
+    This type implements a fixed-timestep frame loop.  Each frame is
+    scheduled for a deadline computed from the start of the loop rather
+    than from the end of the previous frame, so the time taken by the
+    update function does not slow the loop down.  Every frame applies
+    its changes to the canvas in a single batch.
+    """
+
+    DEFAULT_MAX_STEPS = 5
+    HISTORY_SIZE = 240
+
+# Constructor: GFrameLoop
+
+    def __init__(self, gw, update, hz, render=None, max_steps=None):
+        """
+        Creates a new GFrameLoop that calls update hz times per second.
+        The loop must be started by calling the <code>start</code>
+        method.
+        """
+        if hz <= 0:
+            raise Exception("GFrameLoop: hz must be positive")
+        if max_steps is None:
+            max_steps = GFrameLoop.DEFAULT_MAX_STEPS
+        self._gw = gw
+        self._update = update
+        self._render = render
+        self._step = 1000 / hz
+        self._max_steps = max_steps
+        self._entry = None
+        self._running = False
+        self._lag = 0
+        self._last_time = 0
+        self._deadline = 0
+        self._frames = 0
+        self._steps = 0
+        self._dropped_steps = 0
+        self._frame_times = collections.deque(maxlen=GFrameLoop.HISTORY_SIZE)
+        self._frame_stamps = collections.deque(maxlen=GFrameLoop.HISTORY_SIZE)
+
+# Public method: start
+
+    def start(self):
+        """
+        Starts the frame loop.
+        """
+        if self._running:
+            return
+        self._running = True
+        gw = self._gw
+        now = gw._get_time()
+        self._lag = 0
+        self._last_time = now
+        self._deadline = now + self._step
+        self._entry = gw._timer_queue.schedule(self._deadline,
+                                               self._frame_ticked)
+
+# Public method: stop
+
+    def stop(self):
+        """
+        Stops the frame loop.
+        """
+        self._running = False
+        if self._entry is not None:
+            self._gw._timer_queue.cancel(self._entry)
+            self._entry = None
+
+# Public method: is_running
+
+    def is_running(self):
+        """
+        Returns <code>True</code> if the frame loop is running.
+        """
+        return self._running
+
+# Public method: get_fps
+
+    def get_fps(self):
+        """
+        Returns the number of frames per second displayed over the
+        recent history of the loop.
+        """
+        stamps = self._frame_stamps
+        if len(stamps) < 2 or stamps[-1] == stamps[0]:
+            return 0.0
+        return 1000 * (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+# Public method: get_frame_time
+
+    def get_frame_time(self, percentile=50):
+        """
+        Returns the given percentile of the time in milliseconds spent
+        computing each of the recent frames, including every update and
+        the render call.
+        """
+        times = sorted(self._frame_times)
+        if len(times) == 0:
+            return 0.0
+        rank = int(math.ceil(percentile / 100 * len(times)))
+        return times[min(len(times), max(1, rank)) - 1]
+
+# Public method: get_frame_stats
+
+    def get_frame_stats(self):
+        """
+        Returns a dictionary that summarizes the behavior of the loop.
+        The keys are <code>"fps"</code>, <code>"frames"</code>,
+        <code>"steps"</code>, <code>"dropped_steps"</code>, and the frame
+        time percentiles <code>"p50"</code>, <code>"p95"</code>, and
+        <code>"p99"</code>.  Dropped steps are updates that were skipped
+        because catching up would have exceeded the step limit.
+        """
+        return {
+            "fps": self.get_fps(),
+            "frames": self._frames,
+            "steps": self._steps,
+            "dropped_steps": self._dropped_steps,
+            "p50": self.get_frame_time(50),
+            "p95": self.get_frame_time(95),
+            "p99": self.get_frame_time(99)
+        }
+
+# Private method: _frame_ticked
+
+    def _frame_ticked(self):
+        """
+        Runs one frame: calls update once for every step of elapsed time,
+        up to the step limit, and then calls render.
+        """
+        self._entry = None
+        gw = self._gw
+        start = time.perf_counter()
+        now = gw._get_time()
+        step = self._step - __FRAME_TOLERANCE__
+        self._lag += now - self._last_time
+        self._last_time = now
+        steps = 0
+        gw._event_manager._flush_motion()
+        with gw.batch():
+            while self._lag >= step and steps < self._max_steps:
+                self._update()
+                self._lag -= self._step
+                steps += 1
+                if not self._running:
+                    break
+            if self._lag >= step:
+                self._dropped_steps += int(self._lag // self._step)
+                self._lag %= self._step
+            if self._render is not None:
+                self._render()
+        self._steps += steps
+        self._frames += 1
+        self._frame_times.append(1000 * (time.perf_counter() - start))
+        self._frame_stamps.append(now)
+        if gw._profiler is not None:
+            gw._profiler.end_frame()
+        self._deadline += self._step
+        if self._deadline <= now:
+            behind = (now - self._deadline) // self._step + 1
+            self._deadline += behind * self._step
+        if self._running:
+            self._entry = gw._timer_queue.schedule(self._deadline,
+                                                   self._frame_ticked)
+
+# Define camel-case names
+
+    isRunning = is_running
+    getFPS = get_fps
+    getFrameTime = get_frame_time
+    getFrameStats = get_frame_stats
+
+# Class: GProfiler
+
+class GProfiler:
+    """
+    This type collects performance counters for a window, one frame at a
+    time.  A frame ends at the end of each frame of a
+    <code>run_frames</code> loop or whenever <code>end_frame</code> is
+    called.  For each frame, the profiler records the number of calls
+    and the time spent in milliseconds for each of the following keys:
+
+    <pre>
+       rebuild     full rebuilds of the canvas
+       create      canvas items created
+       move        canvas move calls
+       coords      canvas coords calls
+       itemconfig  canvas itemconfig calls
+       delete      canvas delete calls
+       restack     canvas tag_raise and tag_lower calls
+       hit         get_element_at queries on the window
+       contains    contains tests made by those queries
+       timer       timer callbacks
+    </pre>
+
+    Times are inclusive, so the time of a timer callback includes the
+    canvas calls it makes, and the time of a hit query includes the
+    contains tests it makes.  Profilers are created by
+    <code>GWindow.set_profiling</code>.
+    """
+
+    KEYS = ("rebuild", "create", "move", "coords", "itemconfig", "delete",
+            "restack", "hit", "contains", "timer")
+    HISTORY_SIZE = 600
+    OVERLAY_FONT = "10pt 'Courier New','Courier','Monospace'"
+
+# Constructor: GProfiler
+
+    def __init__(self, gw):
+        """
+        Creates a profiler for the window gw.  Clients should not call
+        this constructor directly.
+        """
+        self._gw = gw
+        self._canvas = gw._canvas
+        self._paused = False
+        self._overlay = None
+        self._history = collections.deque(maxlen=GProfiler.HISTORY_SIZE)
+        self.reset()
+
+# Public method: reset
+
+    def reset(self):
+        """
+        Discards the counters for the current frame and the history of
+        completed frames.
+        """
+        self._counts = dict.fromkeys(GProfiler.KEYS, 0)
+        self._times = dict.fromkeys(GProfiler.KEYS, 0.0)
+        self._history.clear()
+        self._frame_start = time.perf_counter()
+
+# Public method: end_frame
+
+    def end_frame(self):
+        """
+        Closes the current frame, adds its counters to the history, and
+        redraws the overlay if it is shown.
+        """
+        now = time.perf_counter()
+        stats = { "frame_time": 1000 * (now - self._frame_start) }
+        for key in GProfiler.KEYS:
+            stats[key] = self._counts[key]
+            stats[key + "_time"] = 1000 * self._times[key]
+        self._history.append(stats)
+        self._counts = dict.fromkeys(GProfiler.KEYS, 0)
+        self._times = dict.fromkeys(GProfiler.KEYS, 0.0)
+        if self._overlay is not None:
+            self._update_overlay(stats)
+        self._frame_start = time.perf_counter()
+
+# Public method: get_frame_stats
+
+    def get_frame_stats(self):
+        """
+        Returns a dictionary with the counters of the last completed
+        frame.  The dictionary contains each key listed in the class
+        description, the matching key with <code>"_time"</code> appended,
+        and the total <code>"frame_time"</code>, all times being in
+        milliseconds.  If no frame has been completed, this method
+        returns <code>None</code>.
+        """
+        if len(self._history) == 0:
+            return None
+        return dict(self._history[-1])
+
+# Public method: get_history
+
+    def get_history(self):
+        """
+        Returns a list of the counters of the recent frames, oldest
+        first, in the form returned by <code>get_frame_stats</code>.
+        """
+        return [ dict(stats) for stats in self._history ]
+
+# Public method: get_totals
+
+    def get_totals(self):
+        """
+        Returns a dictionary with the sum of each counter over the
+        recent frames, together with the number of <code>"frames"</code>.
+        """
+        totals = { "frames": len(self._history), "frame_time": 0.0 }
+        for key in GProfiler.KEYS:
+            totals[key] = 0
+            totals[key + "_time"] = 0.0
+        for stats in self._history:
+            for key, value in stats.items():
+                totals[key] += value
+        return totals
+
+# Public method: write_csv
+
+    def write_csv(self, filename):
+        """
+        Writes the counters of the recent frames to a CSV file with one
+        row per frame and a header row naming the columns.
+        """
+        import csv
+        columns = [ "frame_time" ]
+        for key in GProfiler.KEYS:
+            columns.append(key)
+            columns.append(key + "_time")
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([ "frame" ] + columns)
+            for i, stats in enumerate(self._history):
+                writer.writerow([ i ] + [ stats[c] for c in columns ])
+
+# Public method: set_overlay
+
+    def set_overlay(self, flag):
+        """
+        Shows or hides a label in the upper left corner of the window
+        that displays the counters of the last frame.  The label is
+        drawn in front of every other object, is updated at the end of
+        each frame, and is not counted by the profiler.
+        """
+        if flag and self._overlay is None:
+            self._overlay = GLabel("")
+            self._overlay.set_font(GProfiler.OVERLAY_FONT)
+            if len(self._history) > 0:
+                self._update_overlay(self._history[-1])
+        elif not flag and self._overlay is not None:
+            overlay = self._overlay
+            self._overlay = None
+            if overlay._parent is not None:
+                self._paused = True
+                try:
+                    overlay._parent.remove(overlay)
+                finally:
+                    self._paused = False
+
+# Public method: is_overlay_visible
+
+    def is_overlay_visible(self):
+        """
+        Returns <code>True</code> if the overlay is shown.
+        """
+        return self._overlay is not None
+
+# Private method: _record
+
+    def _record(self, key, seconds, count=1):
+        if not self._paused:
+            self._counts[key] += count
+            self._times[key] += seconds
+
+# Private method: _find_element
+
+    def _find_element(self, x, y):
+        """
+        Performs the search of <code>get_element_at</code> in the window,
+        counting and timing the contains tests it makes.  The overlay is
+        never returned.
+        """
+        start = time.perf_counter()
+        candidates = self._gw._get_candidates(x, y)
+        tests_start = time.perf_counter()
+        tests = 0
+        result = None
+        for gobj in candidates:
+            if gobj is self._overlay:
+                continue
+            tests += 1
+            if gobj.contains(x, y):
+                result = gobj
+                break
+        end = time.perf_counter()
+        self._record("hit", end - start)
+        self._record("contains", end - tests_start, tests)
+        return result
+
+# Private method: _update_overlay
+
+    def _update_overlay(self, stats):
+        text = "frame {:.1f} ms".format(stats["frame_time"])
+        for key in GProfiler.KEYS:
+            if stats[key] > 0:
+                text += "  {} {}".format(key, stats[key])
+        overlay = self._overlay
+        base = self._gw._base
+        self._paused = True
+        try:
+            overlay.set_label(text)
+            if overlay._parent is None:
+                base.add(overlay, 4, 4 + overlay.get_ascent())
+            elif base._contents[-1] is not overlay:
+                overlay.send_to_front()
+        finally:
+            self._paused = False
+
+# Define camel-case names
+
+    endFrame = end_frame
+    getFrameStats = get_frame_stats
+    getHistory = get_history
+    getTotals = get_totals
+    writeCSV = write_csv
+    setOverlay = set_overlay
+    isOverlayVisible = is_overlay_visible
 
 # Class: GEvent
 
@@ -2943,6 +5059,8 @@ class GEvent(object):
     package.
     """
 
+    __slots__ = ()
+
 # Constructor: GEvent
 
     def __init__(self):
@@ -2967,6 +5085,8 @@ class GMouseEvent(GEvent):
     This class maintains the data for a mouse event.
     """
 
+    __slots__ = ("_x", "_y")
+
 # Constructor: GMouseEvent
 
     def __init__(self, tke):
@@ -3015,6 +5135,8 @@ class GKeyEvent(GEvent):
     This class maintains the data for a key event.
     """
 
+    __slots__ = ("_key",)
+
 # Constructor: GKeyEvent
 
     def __init__(self, tke):
@@ -3052,43 +5174,604 @@ class GKeyEvent(GEvent):
         """
         return tkinter._root
 
-# Define camel-class methods
+# Define camel-class methods
+
+    getKey = get_key
+    getSource = get_source
+
+# Class: GState
+
+class GState:
+    """
+    This class implements a simple record type that allows clients to
+    define and maintain attributes.  The purpose of this class it to
+    allow callback functions to share state with the calling environment.
+    Although the closure of the callback function makes it possible to
+    read the contents of variables defined in the caller, Python's
+    implicit declaration rule makes it impossible to reassign new
+    values.  Having this class makes it possible to avoid introducing
+    the nonlocal declaration.
+    """
+
+# Constructor: GState
+
+    def __init__(self):
+        """
+        Creates a new GState with no fields.
+        """
+        pass
+
+# Override method: __str__
+
+    def __str__(self):
+        s = ""
+        for key in sorted(self.__dict__):
+            if not key.startswith("_"):
+                if len(s) > 0:
+                    s += ", "
+                s += str(key) + ":" + repr(self.__dict__[key])
+        return "GState(" + s + ")"
+
+# Class: GHeadlessCanvas
+
+class GHeadlessCanvas:
+    """
+    This class is a pure-Python stand-in for the tkinter canvas that
+    lets a <code>GWindow</code> run without a display.  It implements
+    the part of the <code>tkinter.Canvas</code> interface that pgl uses
+    and records the type, coordinates, options, and tags of every item
+    instead of drawing it.  Timers run on a simulated clock, so
+    <code>event_loop</code> executes timer callbacks as fast as it can,
+    and <code>event_generate</code> delivers mouse and key events.
+    The loop ends when the window is closed or no timers remain.
+    """
+
+# Constructor: GHeadlessCanvas
+
+    def __init__(self, width=GWindow.DEFAULT_WIDTH,
+                 height=GWindow.DEFAULT_HEIGHT):
+        """
+        Creates an empty headless canvas with the specified size.
+        """
+        self._width = width
+        self._height = height
+        self._title = ""
+        self._items = { }
+        self._first = None
+        self._last = None
+        self._tags = { }
+        self._next_id = 1
+        self._bindings = { }
+        self._protocols = { }
+        self._timers = [ ]
+        self._callbacks = { }
+        self._next_after = 1
+        self._time = 0.0
+        self._running = False
+        self._destroyed = False
+
+# Public method: get_time
+
+    def get_time(self):
+        """
+        Returns the simulated time in milliseconds since the canvas was
+        created.
+        """
+        return self._time
+
+# Public method: advance
+
+    def advance(self, delay):
+        """
+        Advances the simulated clock by delay milliseconds, running every
+        timer callback that falls due on the way, in order.
+        """
+        self._run_timers(self._time + delay)
+
+# Item creation methods
+
+    def create_arc(self, *args, **options):
+        return self._create("arc", args, options)
+
+    def create_image(self, *args, **options):
+        return self._create("image", args, options)
+
+    def create_line(self, *args, **options):
+        return self._create("line", args, options)
+
+    def create_oval(self, *args, **options):
+        return self._create("oval", args, options)
+
+    def create_polygon(self, *args, **options):
+        return self._create("polygon", args, options)
+
+    def create_rectangle(self, *args, **options):
+        return self._create("rectangle", args, options)
+
+    def create_text(self, *args, **options):
+        return self._create("text", args, options)
+
+# Item methods
+
+    def coords(self, tag_or_id, *args):
+        """
+        Returns the coordinates of the first matching item, or replaces
+        them if new coordinates are supplied.  As in tkinter, the number
+        of new coordinates must suit the kind of item.
+        """
+        ids = self._find(tag_or_id)
+        if len(ids) == 0:
+            return [ ]
+        item = self._items[ids[0]]
+        if len(args) == 0:
+            return list(item.coords)
+        coords = _flatten_coords(args)
+        self._check_coords(item.kind, coords)
+        item.coords = coords
+
+    def move(self, tag_or_id, dx, dy):
+        for tkid in self._find(tag_or_id):
+            coords = self._items[tkid].coords
+            for i in range(0, len(coords), 2):
+                coords[i] += dx
+                coords[i + 1] += dy
+
+    def itemconfig(self, tag_or_id, **options):
+        for tkid in self._find(tag_or_id):
+            item = self._items[tkid]
+            self._check_options(item.kind, options)
+            if "tags" in options:
+                self._untag(tkid, item.tags)
+                item.tags = _split_tags(options["tags"])
+                self._tag(tkid, item.tags)
+            item.options.update(options)
+
+    itemconfigure = itemconfig
+
+    def itemcget(self, tag_or_id, option):
+        ids = self._find(tag_or_id)
+        if len(ids) == 0:
+            return ""
+        return self._items[ids[0]].options.get(option, "")
+
+    def delete(self, *tags_or_ids):
+        for tag_or_id in tags_or_ids:
+            for tkid in self._find(tag_or_id):
+                self._unlink(tkid)
+                item = self._items.pop(tkid)
+                self._untag(tkid, item.tags)
+
+    def tag_raise(self, tag_or_id, above=None):
+        """
+        Moves the matching items just above the item above, or to the top
+        of the display list if above is missing, keeping their order.
+        """
+        ids = self._find_ordered(tag_or_id)
+        if above is None:
+            anchor = self._last
+        else:
+            anchor = self._find_ordered(above)[-1]
+        for tkid in ids:
+            if tkid != anchor:
+                self._unlink(tkid)
+                self._link_after(tkid, anchor)
+                anchor = tkid
+
+    def tag_lower(self, tag_or_id, below=None):
+        """
+        Moves the matching items just below the item below, or to the
+        bottom of the display list if below is missing, keeping their
+        order.
+        """
+        ids = self._find_ordered(tag_or_id)
+        if below is None:
+            anchor = self._first
+        else:
+            anchor = self._find_ordered(below)[0]
+        for tkid in reversed(ids):
+            if tkid != anchor:
+                self._unlink(tkid)
+                if anchor is None:
+                    self._link_after(tkid, None)
+                else:
+                    self._link_after(tkid, self._items[anchor].prev)
+                anchor = tkid
+
+    lift = tag_raise
+    lower = tag_lower
+
+    def find_all(self):
+        """
+        Returns the ids of every item, from the bottom of the display
+        list to the top.
+        """
+        return tuple(self._display_order())
+
+    def find_withtag(self, tag_or_id):
+        return tuple(self._find(tag_or_id))
+
+    def find_overlapping(self, x1, y1, x2, y2):
+        """
+        Returns the ids of the visible items whose bounding boxes overlap
+        the rectangle, from the bottom of the display list to the top.
+        Text and image items are anchored at a single point and have no
+        extent here, so they are reported for every rectangle.
+        """
+        result = [ ]
+        for tkid in self._display_order():
+            item = self._items[tkid]
+            if item.options.get("state") == "hidden":
+                continue
+            coords = item.coords
+            if len(coords) > 2:
+                xs = coords[0::2]
+                ys = coords[1::2]
+                if min(xs) > x2 or max(xs) < x1 or \
+                   min(ys) > y2 or max(ys) < y1:
+                    continue
+            result.append(tkid)
+        return tuple(result)
+
+    def type(self, tag_or_id):
+        ids = self._find(tag_or_id)
+        if len(ids) == 0:
+            return None
+        return self._items[ids[0]].kind
+
+    def addtag_withtag(self, newtag, tag_or_id):
+        for tkid in self._find(tag_or_id):
+            item = self._items[tkid]
+            if newtag not in item.tags:
+                item.tags = item.tags + (newtag,)
+                self._tag(tkid, (newtag,))
+
+    def gettags(self, tag_or_id):
+        ids = self._find(tag_or_id)
+        if len(ids) == 0:
+            return ()
+        return self._items[ids[0]].tags
+
+# Timer methods
+
+    def after(self, delay, fn):
+        after_id = "after#" + str(self._next_after)
+        self._next_after += 1
+        self._callbacks[after_id] = fn
+        heapq.heappush(self._timers,
+                       (self._time + max(0, delay), after_id))
+        return after_id
+
+    def after_idle(self, fn):
+        return self.after(0, fn)
+
+    def after_cancel(self, after_id):
+        self._callbacks.pop(after_id, None)
+
+# Event methods
+
+    def bind(self, sequence, fn):
+        self._bindings[_canonical_sequence(sequence)] = fn
+
+    def event_generate(self, sequence, x=0, y=0, keysym="", char=""):
+        """
+        Delivers a synthetic event to the handler bound to sequence.
+        Mouse events use the <code>x</code> and <code>y</code> options,
+        and key events use <code>keysym</code> and <code>char</code>.
+        """
+        fn = self._bindings.get(_canonical_sequence(sequence))
+        if fn is not None:
+            fn(_GHeadlessEvent(self, x, y, keysym, char))
+
+    def focus_set(self):
+        pass
+
+# Window methods
+
+    def pack(self):
+        pass
+
+    def title(self, title=None):
+        if title is None:
+            return self._title
+        self._title = title
+
+    def protocol(self, name, fn):
+        self._protocols[name] = fn
+
+    def update(self):
+        self._run_timers(self._time)
+
+    def update_idletasks(self):
+        pass
+
+    def mainloop(self):
+        """
+        Runs timer callbacks in order of their due time, jumping the
+        simulated clock forward between them, until the canvas is
+        destroyed, <code>quit</code> is called, or no timers remain.
+        """
+        self._running = True
+        while self._running and not self._destroyed:
+            if not self._run_next_timer(None):
+                break
+        self._running = False
+
+    def quit(self):
+        self._running = False
+
+    def destroy(self):
+        self._destroyed = True
+        self._running = False
+        self._timers = [ ]
+        self._callbacks = { }
+
+# Private methods
+
+    def _create(self, kind, args, options):
+        coords = _flatten_coords(args)
+        self._check_coords(kind, coords)
+        self._check_options(kind, options)
+        tkid = self._next_id
+        self._next_id += 1
+        tags = _split_tags(options.get("tags", ()))
+        self._items[tkid] = _GHeadlessItem(kind, coords,
+                                           options, tags)
+        self._link_after(tkid, self._last)
+        self._tag(tkid, tags)
+        return tkid
+
+    def _display_order(self):
+        """
+        Generates the item ids from the bottom of the display list to the
+        top.  The display list is a doubly linked list threaded through
+        the items, so raising and lowering take constant time.
+        """
+        tkid = self._first
+        while tkid is not None:
+            next_id = self._items[tkid].next
+            yield tkid
+            tkid = next_id
+
+    def _link_after(self, tkid, anchor):
+        """
+        Inserts item tkid after anchor, or at the bottom if anchor is
+        <code>None</code>.
+        """
+        item = self._items[tkid]
+        item.prev = anchor
+        if anchor is None:
+            item.next = self._first
+            self._first = tkid
+        else:
+            item.next = self._items[anchor].next
+            self._items[anchor].next = tkid
+        if item.next is None:
+            self._last = tkid
+        else:
+            self._items[item.next].prev = tkid
+
+    def _unlink(self, tkid):
+        item = self._items[tkid]
+        if item.prev is None:
+            self._first = item.next
+        else:
+            self._items[item.prev].next = item.next
+        if item.next is None:
+            self._last = item.prev
+        else:
+            self._items[item.next].prev = item.prev
+        item.prev = None
+        item.next = None
+
+    def _find_ordered(self, tag_or_id):
+        """
+        Returns the matching ids in display order.
+        """
+        ids = self._find(tag_or_id)
+        if len(ids) > 1:
+            members = set(ids)
+            ids = [ tkid for tkid in self._display_order()
+                    if tkid in members ]
+        return ids
+
+    def _find(self, tag_or_id):
+        if isinstance(tag_or_id, int):
+            if tag_or_id in self._items:
+                return [ tag_or_id ]
+            return [ ]
+        if tag_or_id == "all":
+            return list(self._display_order())
+        if isinstance(tag_or_id, str) and tag_or_id.isdigit():
+            return self._find(int(tag_or_id))
+        tagged = self._tags.get(tag_or_id)
+        if tagged is None:
+            return [ ]
+        return list(tagged)
+
+    def _check_coords(self, kind, coords):
+        """
+        Raises the error tkinter reports if the number of coordinates
+        does not suit an item of the specified kind: exactly four for a
+        rectangle, oval, or arc, two for text or an image, an even number
+        of at least four for a line, and an even number for a polygon,
+        which tkinter allows to be empty while its vertices are added.
+        """
+        n = len(coords)
+        if kind in ("line", "polygon"):
+            if n % 2 != 0:
+                raise tkinter.TclError("wrong # coordinates: expected an " +
+                                       "even number, got " + str(n))
+            if kind == "line" and n < 4:
+                raise tkinter.TclError("wrong # coordinates: expected at " +
+                                       "least 4, got " + str(n))
+            return
+        if kind in ("text", "image"):
+            expected = 2
+        else:
+            expected = 4
+        if n != expected:
+            raise tkinter.TclError("wrong # coordinates: expected " +
+                                   str(expected) + ", got " + str(n))
+
+    def _check_options(self, kind, options):
+        """
+        Raises the error tkinter reports if an option does not apply to
+        an item of the specified kind, such as <code>start</code> on a
+        polygon.
+        """
+        allowed = _CANVAS_ITEM_OPTIONS[kind]
+        for name in options:
+            if name not in allowed:
+                raise tkinter.TclError("unknown option \"-" + name + "\"")
+
+    def _tag(self, tkid, tags):
+        for tag in tags:
+            if tag not in self._tags:
+                self._tags[tag] = { }
+            self._tags[tag][tkid] = None
+
+    def _untag(self, tkid, tags):
+        for tag in tags:
+            tagged = self._tags[tag]
+            del tagged[tkid]
+            if len(tagged) == 0:
+                del self._tags[tag]
+
+    def _run_timers(self, limit):
+        while self._run_next_timer(limit):
+            pass
+        self._time = max(self._time, limit)
+
+    def _run_next_timer(self, limit):
+        while len(self._timers) > 0:
+            due, after_id = self._timers[0]
+            if limit is not None and due > limit:
+                return False
+            heapq.heappop(self._timers)
+            fn = self._callbacks.pop(after_id, None)
+            if fn is not None:
+                self._time = max(self._time, due)
+                fn()
+                return True
+        return False
+
+# Define camel-case names
+
+    getTime = get_time
+
+# Private function: get_image_model
+
+def _get_image_model():
+    """
+    Returns <code>"PIL"</code> if the Pillow library is available and
+    <code>"PhotoImage"</code> otherwise.  Pillow is imported the first
+    time this function is called.
+    """
+    global _image_model, _Image, _ImageTk
+    if _image_model is None:
+        try:
+            from PIL import Image, ImageTk  # pylint: disable=import-error
+            _Image = Image
+            _ImageTk = ImageTk
+            _image_model = "PIL"
+        except Exception:
+            _image_model = "PhotoImage"
+    return _image_model
+
+# Private function: load_numpy
+
+def _load_numpy():
+    """
+    Returns the NumPy module, importing it the first time this function
+    is called, or <code>None</code> if NumPy is not available.
+    """
+    global _np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy                    # pylint: disable=import-error
+            _np = numpy
+        except Exception:
+            _np = None
+    return _np
+
+# Private function: is_ndarray
 
-    getKey = get_key
-    getSource = get_source
+def _is_ndarray(value):
+    """
+    Returns <code>True</code> if value is a NumPy array.  An array can
+    exist only if some module has already imported NumPy, so this test
+    never imports it.
+    """
+    numpy = sys.modules.get("numpy")
+    if numpy is None or not isinstance(value, numpy.ndarray):
+        return False
+    _load_numpy()
+    return True
 
-# Class: GState
+# Private function: fetch_url
 
-class GState:
+def _fetch_url(url):
     """
-    This class implements a simple record type that allows clients to
-    define and maintain attributes.  The purpose of this class it to
-    allow callback functions to share state with the calling environment.
-    Although the closure of the callback function makes it possible to
-    read the contents of variables defined in the caller, Python's
-    implicit declaration rule makes it impossible to reassign new
-    values.  Having this class makes it possible to avoid introducing
-    the nonlocal declaration.
+    Returns the contents of the URL as bytes, reading them from the disk
+    cache if possible and storing them there otherwise.
+    """
+    cache = _get_url_cache()
+    if cache is not None:
+        data = cache.get(url)
+        if data is not None:
+            return data
+    data = _read_url(url)
+    if cache is not None:
+        cache.put(url, data)
+    return data
+
+# Private function: get_url_cache
+
+def _get_url_cache():
     """
+    Returns the disk cache for URL images, creating the default cache
+    the first time it is needed, or <code>None</code> if the cache has
+    been turned off.
+    """
+    global _url_cache
+    if _url_cache is None:
+        directory = os.path.join(os.path.expanduser("~"), ".cache", "pgl",
+                                 "images")
+        _url_cache = _GDiskCache(directory, GImage.DEFAULT_URL_CACHE_SIZE)
+    if _url_cache is False:
+        return None
+    return _url_cache
 
-# Constructor: GState
+# Private function: get_url_executor
 
-    def __init__(self):
-        """
-        Creates a new GState with no fields.
-        """
-        pass
+def _get_url_executor():
+    """
+    Returns the thread pool that downloads images for
+    <code>GWindow.load_image</code>, creating it on first use.
+    """
+    global _url_executor
+    if _url_executor is None:
+        import concurrent.futures
+        _url_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=__URL_LOADER_THREADS__,
+            thread_name_prefix="pgl-url")
+    return _url_executor
 
-# Override method: __str__
+# Private function: read_url
 
-    def __str__(self):
-        s = ""
-        for key in sorted(self.__dict__):
-            if not key.startswith("_"):
-                if len(s) > 0:
-                    s += ", "
-                s += str(key) + ":" + repr(self.__dict__[key])
-        return "GState(" + s + ")"
+def _read_url(url):
+    """
+    Returns the contents of the URL as bytes.  The networking modules are
+    imported only when an image is first loaded from a URL.
+    """
+    import ssl
+    import urllib.request
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    with urllib.request.urlopen(url, context=ctx) as req:
+        return req.read()
 
 # Private function: get_screen_width
 
@@ -3111,17 +5794,50 @@ def _get_screen_height():
 def _convert_color_to_rgb(color_name):
     """
     Converts a color name into an integer that encodes the
-    red, green, and blue components of the color.
+    red, green, and blue components of the color.  Integers are
+    returned unchanged.
     """
-    if color_name == "":
-        return -1
-    if color_name[0] == "#":
-        color_name = "0x" + color_name[1:]
-        return int(color_name, 16)
-    name = _canonical_color_name(color_name)
-    if name not in COLOR_TABLE:
-        raise Exception("set_color: Illegal color - " + color_name)
-    return COLOR_TABLE[name]
+    if isinstance(color_name, int):
+        return color_name
+    return _lookup_color(color_name)[0]
+
+# Private function: resolve_color
+
+def _resolve_color(color):
+    """
+    Converts a color name or integer into the form <code>"#rrggbb"</code>
+    stored by graphical objects.  The empty string means no color.
+    """
+    if isinstance(color, int):
+        return _convert_rgb_to_color(color)
+    return _lookup_color(color)[1]
+
+# Private function: lookup_color
+
+def _lookup_color(color_name):
+    """
+    Returns a tuple of the integer and <code>"#rrggbb"</code> forms of a
+    color name.  Results are memoized, since programs tend to use the
+    same few names over and over.  The memo is cleared when it reaches
+    <code>__COLOR_MEMO_SIZE__</code> entries, which bounds its size
+    even for programs that generate random color strings.
+    """
+    entry = _color_memo.get(color_name)
+    if entry is None:
+        if color_name == "":
+            entry = (-1, "")
+        elif color_name[0] == "#":
+            rgb = int(color_name[1:], 16)
+            entry = (rgb, _convert_rgb_to_color(rgb))
+        else:
+            name = _canonical_color_name(color_name)
+            if name not in COLOR_TABLE:
+                raise Exception("set_color: Illegal color - " + color_name)
+            entry = (COLOR_TABLE[name], _COLOR_HEX_TABLE[name])
+        if len(_color_memo) >= __COLOR_MEMO_SIZE__:
+            _color_memo.clear()
+        _color_memo[color_name] = entry
+    return entry
 
 # Private function: convert_rgb_to_color
 
@@ -3132,8 +5848,44 @@ def _convert_rgb_to_color(rgb):
     values are two-digit hexadecimal numbers indicating the intensity
     of that component.
     """
-    hex_string = hex(0xFF000000 | rgb)
-    return "#" + hex_string[4:].upper()
+    if rgb < 0:
+        return ""
+    return "#{:06X}".format(rgb & 0xFFFFFF)
+
+# Private function: argb_to_rgba
+
+def _argb_to_rgba(pixels, width, height):
+    """
+    Converts a two-dimensional array of ARGB integers into a buffer of
+    RGBA bytes.  The conversion runs in NumPy if it is available and
+    otherwise packs the integers with struct and swaps the red and blue
+    bytes with slice assignments, so no Python code runs per byte.
+    """
+    if _load_numpy() is not None:
+        argb = _np.asarray(pixels, dtype=_np.int64).reshape(height, width)
+        argb = (argb & 0xFFFFFFFF).astype("<u4")
+        bgra = argb.view(_np.uint8).reshape(height, width, 4)
+        return bgra[:, :, [ 2, 1, 0, 3 ]]
+    flat = [ p & 0xFFFFFFFF for row in pixels for p in row ]
+    data = bytearray(struct.pack("<" + str(len(flat)) + "I", *flat))
+    data[0::4], data[2::4] = data[2::4], data[0::4]
+    return data
+
+# Private function: rgba_to_argb
+
+def _rgba_to_argb(data, width, height):
+    """
+    Converts a buffer of RGBA bytes into a two-dimensional list of ARGB
+    integers.  This function is the inverse of <code>_argb_to_rgba</code>.
+    """
+    if _load_numpy() is not None:
+        rgba = _np.frombuffer(data, dtype=_np.uint8).reshape(height, width, 4)
+        bgra = _np.ascontiguousarray(rgba[:, :, [ 2, 1, 0, 3 ]])
+        return bgra.view("<u4").reshape(height, width).tolist()
+    data = bytearray(data)
+    data[0::4], data[2::4] = data[2::4], data[0::4]
+    flat = struct.unpack("<" + str(width * height) + "I", data)
+    return [ list(flat[i * width:(i + 1) * width]) for i in range(height) ]
 
 # Private function: exit_graphics
 
@@ -3148,32 +5900,18 @@ def _exit_graphics():
 
 def _get_program_name():
     """
-    Returns the name of the program.
+    Returns the name of the program, which is the name of the file run
+    as the main module.  Spyder's <code>runfile</code> sets both
+    <code>__main__.__file__</code> and <code>sys.argv</code> to that
+    file, so no introspection of the call stack is needed.
     """
-    name = None
-    try:
-        stack = inspect.stack()
-        i = len(stack) - 1
-        while i >= 0 and name is None:
-            code = stack[i].code_context[stack[i].index]
-            rf = code.find("runfile(")
-            if rf >= 0:
-                start = rf + len("runfile('")
-                finish = code.find("'", start)
-                name = code[start:finish]
-            else:
-                i -= 1
-        if name is None:
-            i = len(stack) - 1
-            while i >= 0 and name is None:
-                if stack[i].filename:
-                    name = stack[i].filename
-                else:
-                    i -= 1
-    except Exception:
-        return "Graphics Window"
-    if name is None:
+    main = sys.modules.get("__main__")
+    name = getattr(main, "__file__", None)
+    if not name and len(sys.argv) > 0 and sys.argv[0] not in ("", "-c"):
+        name = sys.argv[0]
+    if not name:
         return "Graphics Window"
+    name = name.replace("\\", "/")
     name = name[name.rfind("/") + 1:]
     dot = name.find(".")
     if dot != -1:
@@ -3182,12 +5920,8 @@ def _get_program_name():
 
 # Private function: canonical_color_name
 
-def _canonical_color_name(str):
-    result = ""
-    for char in str:
-        if not char.isspace() and char != "_":
-            result += char.lower()
-    return result
+def _canonical_color_name(name):
+    return "".join(name.split()).replace("_", "").lower()
 
 # Private function: dsq
 
@@ -3197,6 +5931,25 @@ def _dsq(x0, y0, x1, y1):
     """
     return (x1 - x0) * (x1 - x0) + (y1 - y0) * (y1 - y0)
 
+# Private function: get_font_info
+
+def _get_font_info(name):
+    """
+    Returns the shared <code>_GFontInfo</code> for a font string.  Labels
+    that use the same font share one font object and one set of cached
+    metrics.  The table is keyed by the tkinter root as well as the
+    name, because fonts belong to a root and fonts created without one
+    only have approximate metrics.
+    """
+    key = (name, id(getattr(tkinter, "_root", None)))
+    info = _font_table.get(key)
+    if info is None:
+        if len(_font_table) >= __FONT_TABLE_SIZE__:
+            _font_table.clear()
+        info = _GFontInfo(_decode_font(name))
+        _font_table[key] = info
+    return info
+
 # Private function: decode_font
 
 def _decode_font(name):
@@ -3245,8 +5998,7 @@ def _parse_js_font(name):
         if family.startswith("'") or family.startswith("\""):
             family = family[1:-1]
         # // Add code to test for existence of font family
-        return tk_font.Font(family=family, size=-size,
-                            weight=weight, slant=slant)
+        return _create_font(family, size, weight, slant)
     return None
 
 def _parse_java_font(name):
@@ -3260,13 +6012,23 @@ def _parse_java_font(name):
     weight = "normal"
     slant = "roman"
     if components[1][0].isdigit():
-        size = components[1]
+        size = int(components[1])
     else:
-        size = components[2]
+        size = int(components[2])
         if "bold" in components[1]:
             weight = "bold"
         if "italic" in components[1]:
             slant = "italic"
+    return _create_font(family, size, weight, slant)
+
+def _create_font(family, size, weight, slant):
+    """
+    Creates a font with the given pixel size.  This function returns a
+    tkinter <code>Font</code> when tkinter has a root window and a
+    <code>_GHeadlessFont</code> with approximate metrics otherwise.
+    """
+    if getattr(tkinter, "_default_root", None) is None:
+        return _GHeadlessFont(family, size, weight, slant)
     return tk_font.Font(family=family, size=-size,
                         weight=weight, slant=slant)
 
@@ -3285,15 +6047,229 @@ def _parse_js_units(spec):
     else:
         return round(value)
 
+# Private class: _GHeadlessItem
+
+class _GHeadlessItem:
+    """
+    This class records the state of one item on a
+    <code>GHeadlessCanvas</code>.
+    """
+
+    __slots__ = ("kind", "coords", "options", "tags", "prev", "next")
+
+    def __init__(self, kind, coords, options, tags):
+        self.kind = kind
+        self.coords = coords
+        self.options = options
+        self.tags = tags
+        self.prev = None
+        self.next = None
+
+# Private class: _GHeadlessEvent
+
+class _GHeadlessEvent:
+    """
+    This class carries the fields of a tkinter event that the event
+    manager reads.
+    """
+
+    def __init__(self, widget, x, y, keysym, char):
+        self.widget = widget
+        self.x = x
+        self.y = y
+        self.keysym = keysym
+        self.char = char
+
+# Private class: _GHeadlessPhoto
+
+class _GHeadlessPhoto:
+    """
+    This class stands in for <code>ImageTk.PhotoImage</code> on a
+    headless canvas and keeps the PIL image it was made from.
+    """
+
+    def __init__(self, image):
+        self.image = image
+
+    def width(self):
+        return self.image.width
+
+    def height(self):
+        return self.image.height
+
+# Private class: _GHeadlessFont
+
+class _GHeadlessFont:
+    """
+    This class stands in for a tkinter <code>Font</code> when no tkinter
+    root window exists.  Its metrics are estimated from the pixel size,
+    which is close enough to lay out labels in a headless window.  The
+    string form is a tkinter font description, so the font still works
+    if it ends up on a real canvas.
+    """
+
+    def __init__(self, family, size, weight, slant):
+        self._family = family
+        self._size = size
+        self._weight = weight
+        self._slant = slant
+        descent = max(1, round(0.22 * size))
+        self._metrics = {
+            "ascent": size - descent + 1,
+            "descent": descent,
+            "linespace": size + 1,
+            "fixed": 0
+        }
+        if weight == "bold":
+            self._char_width = 0.62 * size
+        else:
+            self._char_width = 0.55 * size
+
+    def __str__(self):
+        return "{" + self._family + "} " + str(-self._size) + " " + \
+               self._weight + " " + self._slant
+
+    def measure(self, text):
+        return round(self._char_width * len(text))
+
+    def metrics(self, *options):
+        if len(options) == 0:
+            return dict(self._metrics)
+        return self._metrics[options[0]]
+
+# Private function: _flatten_coords
+
+def _flatten_coords(args):
+    """
+    Returns the coordinate arguments of a canvas call as a flat list of
+    floats, accepting either separate numbers or a single sequence.
+    """
+    if len(args) == 1 and isinstance(args[0], (list, tuple)):
+        args = args[0]
+    try:
+        return list(map(float, args))
+    except TypeError:
+        pass
+    coords = [ ]
+    for value in args:
+        if isinstance(value, (list, tuple)):
+            coords.extend(float(v) for v in value)
+        else:
+            coords.append(float(value))
+    return coords
+
+# Private function: _split_tags
+
+def _split_tags(tags):
+    """
+    Returns the tags option of a canvas item as a tuple of strings.
+    """
+    if tags is None or tags == "":
+        return ()
+    if isinstance(tags, str):
+        return tuple(tags.split())
+    return tuple(tags)
+
+# Private function: _longest_increasing_run
+
+def _longest_increasing_run(values):
+    """
+    Returns a dictionary whose keys are the indices of a longest strictly
+    increasing subsequence of values, found by patience sorting.
+    """
+    tails = [ ]
+    tail_index = [ ]
+    previous = [ -1 ] * len(values)
+    for i, value in enumerate(values):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_index.append(i)
+        else:
+            tails[k] = value
+            tail_index[k] = i
+        if k > 0:
+            previous[i] = tail_index[k - 1]
+    result = { }
+    i = tail_index[-1] if len(tail_index) > 0 else -1
+    while i != -1:
+        result[i] = None
+        i = previous[i]
+    return result
+
+# Private function: _canonical_sequence
+
+def _canonical_sequence(sequence):
+    """
+    Maps equivalent tkinter event sequences to a single name.
+    """
+    aliases = {
+        "<Button-1>": "<ButtonPress-1>",
+        "<1>": "<ButtonPress-1>",
+        "<KeyPress>": "<Key>"
+    }
+    return aliases.get(sequence, sequence)
+
+# Private class: _GFontInfo
+
+class _GFontInfo:
+    """
+    This class caches the metrics of a font.  The vertical metrics are
+    read once, and the widths of measured strings are kept in a
+    least-recently-used table, so steady-state label updates do not
+    query the font at all.
+    """
+
+    def __init__(self, font):
+        self.font = font
+        metrics = font.metrics()
+        self.ascent = metrics["ascent"]
+        self.descent = metrics["descent"]
+        self.linespace = metrics["linespace"]
+        self._widths = collections.OrderedDict()
+
+    def measure(self, text):
+        widths = self._widths
+        width = widths.get(text)
+        if width is None:
+            width = self.font.measure(text)
+            widths[text] = width
+            if len(widths) > __TEXT_WIDTH_CACHE_SIZE__:
+                widths.popitem(last=False)
+        else:
+            widths.move_to_end(text)
+        return width
+
 # Private class: _GTransform
 
 class _GTransform:
+    """
+    This class represents the transformation from the coordinates of a
+    compound to the canvas, which is a uniform scale and a rotation
+    followed by a translation.  The transformation is stored as the
+    coefficients of a 2x3 affine matrix, computed once when the object
+    is created, so transforming a point costs four multiplications.
+    Transforms never change after they are created.
+    """
+
+    __slots__ = ("_tx", "_ty", "_rotation", "_sf", "_a", "_b", "_c", "_d")
 
     def __init__(self, tx=0.0, ty=0.0, rotation=0.0, sf=1.0):
         self._tx = tx
         self._ty = ty
         self._rotation = rotation
         self._sf = sf
+        if rotation == 0:
+            ct = 1.0
+            st = 0.0
+        else:
+            theta = math.radians(rotation)
+            ct = math.cos(theta)
+            st = math.sin(theta)
+        self._a = sf * ct
+        self._b = sf * st
+        self._c = -sf * st
+        self._d = sf * ct
 
     def __str__(self):
        return "{{tx:{} ty:{} rot:{} sf:{}}}".format(self._tx, self._ty,
@@ -3318,22 +6294,769 @@ class _GTransform:
         else:
             x0 = a1
             y0 = a2
-        if self._rotation == 0:
-            x1 = self._tx + self._sf * x0
-            y1 = self._ty + self._sf * y0
-        else:
-            ct = math.cos(math.radians(self._rotation))
-            st = math.sin(math.radians(self._rotation))
-            x1 = self._tx + self._sf * (x0 * ct + y0 * st)
-            y1 = self._ty + self._sf * (y0 * ct - x0 * st)
-        return GPoint(x1, y1)
+        return GPoint(self._tx + self._a * x0 + self._b * y0,
+                      self._ty + self._c * x0 + self._d * y0)
+
+    def transform_xy(self, x, y):
+        """
+        Transforms the point (x, y) and returns the result as a tuple,
+        which avoids allocating a <code>GPoint</code>.
+        """
+        return (self._tx + self._a * x + self._b * y,
+                self._ty + self._c * x + self._d * y)
+
+    def transform_vector(self, dx, dy):
+        """
+        Transforms the displacement (dx, dy), ignoring the translation.
+        """
+        return (self._a * dx + self._b * dy, self._c * dx + self._d * dy)
+
+    def transform_many(self, xs, ys):
+        """
+        Transforms the points whose coordinates are given by the parallel
+        sequences xs and ys and returns a flat list of the form
+        <code>[ x0, y0, x1, y1, ... ]</code>, as the canvas expects.
+        Long sequences are transformed in one NumPy pass if NumPy is
+        available.
+        """
+        a = self._a
+        b = self._b
+        c = self._c
+        d = self._d
+        tx = self._tx
+        ty = self._ty
+        if len(xs) >= __VECTORIZE_THRESHOLD__ and _load_numpy() is not None:
+            xs = _np.asarray(xs, dtype=float)
+            ys = _np.asarray(ys, dtype=float)
+            coords = _np.empty(2 * len(xs))
+            coords[0::2] = tx + a * xs + b * ys
+            coords[1::2] = ty + c * xs + d * ys
+            return coords.tolist()
+        coords = [ ]
+        for x, y in zip(xs, ys):
+            coords.append(tx + a * x + b * y)
+            coords.append(ty + c * x + d * y)
+        return coords
+
+    def translate(self, dx, dy):
+        """
+        Returns this transform followed by a translation by (dx, dy).  The
+        coefficients are copied, so no trigonometry is repeated.
+        """
+        result = _GTransform.__new__(_GTransform)
+        result._tx = self._tx + dx
+        result._ty = self._ty + dy
+        result._rotation = self._rotation
+        result._sf = self._sf
+        result._a = self._a
+        result._b = self._b
+        result._c = self._c
+        result._d = self._d
+        return result
 
     def compose(self, transform):
-        return _GTransform(self._tx + transform.get_tx(),
-                           self._ty + transform.get_ty(),
+        """
+        Returns the transform that applies transform first and then this
+        one.  The translation of transform is mapped through this
+        transform, so the location of a nested compound is rotated and
+        scaled along with its contents.
+        """
+        tx, ty = self.transform_xy(transform._tx, transform._ty)
+        return _GTransform(tx, ty,
                            rotation=self._rotation + transform._rotation,
                            sf=self._sf * transform._sf)
 
+# Private class: _GSpatialIndex
+
+class _GSpatialIndex:
+    """
+    This class implements the uniform grid behind
+    <code>GCompound.set_spatial_index</code>.  Each object is entered in
+    every cell overlapped by its bounding box, grown by the hit tolerance
+    so that lines and unfilled arcs are found near their edges.  Objects
+    whose bounds cover too many cells go into a short list that every
+    query checks.  Changes in bounds are recorded as stale entries and
+    applied lazily at the start of the next query, so moving objects
+    costs nothing until someone asks for an element.
+    """
+
+    MAX_CELLS = 256
+
+    def __init__(self, cell_size):
+        self._cell_size = cell_size
+        self._cells = { }
+        self._entries = { }
+        self._oversize = { }
+        self._stale = { }
+
+    def add(self, gobj):
+        key = id(gobj)
+        self._entries[key] = None
+        self._stale[key] = gobj
+
+    def remove(self, gobj):
+        key = id(gobj)
+        if key in self._entries:
+            self._unlink(key)
+            del self._entries[key]
+            self._stale.pop(key, None)
+
+    def clear(self):
+        self._cells = { }
+        self._entries = { }
+        self._oversize = { }
+        self._stale = { }
+
+    def invalidate(self, gobj):
+        key = id(gobj)
+        if key in self._entries:
+            self._stale[key] = gobj
+
+    def get_element_at(self, x, y):
+        for gobj in self.get_candidates(x, y):
+            if gobj.contains(x, y):
+                return gobj
+        return None
+
+    def get_candidates(self, x, y):
+        """
+        Returns the objects that might contain (x, y), topmost first.
+        """
+        if len(self._stale) > 0:
+            self._refresh()
+        cs = self._cell_size
+        cell = self._cells.get((int(x // cs), int(y // cs)))
+        candidates = list(self._oversize.values())
+        if cell is not None:
+            candidates.extend(cell.values())
+        candidates.sort(key=lambda gobj: gobj._z, reverse=True)
+        return candidates
+
+    def _refresh(self):
+        stale = self._stale
+        self._stale = { }
+        for key, gobj in stale.items():
+            self._unlink(key)
+            self._link(key, gobj)
+
+    def _link(self, key, gobj):
+        bounds = gobj.get_bounds()
+        if bounds is None:
+            self._entries[key] = ()
+            return
+        t = max(__LINE_TOLERANCE__, __ARC_TOLERANCE__)
+        cs = self._cell_size
+        i0 = int((bounds._x - t) // cs)
+        j0 = int((bounds._y - t) // cs)
+        i1 = int((bounds._x + bounds._width + t) // cs)
+        j1 = int((bounds._y + bounds._height + t) // cs)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > self.MAX_CELLS:
+            self._oversize[key] = gobj
+            self._entries[key] = ()
+            return
+        cells = [ ]
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = self._cells.get((i, j))
+                if cell is None:
+                    cell = { }
+                    self._cells[(i, j)] = cell
+                cell[key] = gobj
+                cells.append((i, j))
+        self._entries[key] = cells
+
+    def _unlink(self, key):
+        cells = self._entries.get(key)
+        if cells is None:
+            return
+        self._oversize.pop(key, None)
+        for ij in cells:
+            cell = self._cells[ij]
+            del cell[key]
+            if len(cell) == 0:
+                del self._cells[ij]
+        self._entries[key] = None
+
+# Private class: _GImageCache
+
+class _GImageCache:
+    """
+    This class keeps the photos created for scaled and rotated images so
+    that rebuilding a window does not resample them.  Entries are keyed
+    by the identity of the source image together with the scale factor
+    and rotation, and the least recently used entries are evicted once
+    their total size, counted as four bytes per pixel, exceeds the
+    limit.  Each entry holds a reference to its source image, so the id
+    in its key cannot be reused while the entry exists.
+    """
+
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def lookup(self, image, sf, rotation):
+        key = (id(image), sf, rotation)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry[1]
+
+    def store(self, image, sf, rotation, value):
+        photo = value[0]
+        nbytes = 4 * photo.width() * photo.height()
+        if nbytes > self._max_bytes:
+            return
+        key = (id(image), sf, rotation)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        self._entries[key] = (image, value, nbytes)
+        self._bytes += nbytes
+        self._evict()
+
+    def set_max_bytes(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._evict()
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self):
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes
+        }
+
+    def _evict(self):
+        while self._bytes > self._max_bytes and len(self._entries) > 0:
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry[2]
+            self._evictions += 1
+
+# Private class: _GDiskCache
+
+class _GDiskCache:
+    """
+    This class keeps downloaded files in a directory, one file per URL,
+    named by the SHA-256 hash of the URL.  Reading a file marks it as
+    recently used by updating its modification time, and writing one
+    deletes the least recently used files until the directory fits in
+    max_bytes.  Files are written to a temporary name and renamed, so
+    worker threads never see a partial file.
+    """
+
+    def __init__(self, directory, max_bytes):
+        import threading
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        path = self._get_path(url)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, url, data):
+        if len(data) > self._max_bytes:
+            return
+        path = self._get_path(url)
+        tmp = path + "." + str(id(data)) + ".tmp"
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._evict()
+
+    def clear(self):
+        with self._lock:
+            for path, size, mtime in self._list_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _get_path(self, url):
+        import hashlib
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, name)
+
+    def _list_files(self):
+        files = [ ]
+        try:
+            entries = os.scandir(self._directory)
+        except OSError:
+            return files
+        with entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    st = entry.stat()
+                    files.append((entry.path, st.st_size, st.st_mtime))
+        return files
+
+    def _evict(self):
+        with self._lock:
+            files = self._list_files()
+            total = sum(size for path, size, mtime in files)
+            if total <= self._max_bytes:
+                return
+            files.sort(key=lambda entry: entry[2])
+            for path, size, mtime in files:
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+                if total <= self._max_bytes:
+                    break
+
+# Private class: _GProfiledCanvas
+
+class _GProfiledCanvas:
+    """
+    This class stands in for the canvas of a window while profiling is
+    on.  The calls that change canvas items are counted and timed by the
+    profiler, and everything else is passed straight through.
+    """
+
+    CREATE_METHODS = ("create_arc", "create_image", "create_line",
+                      "create_oval", "create_polygon", "create_rectangle",
+                      "create_text")
+    PROFILED_METHODS = (("move", "move"), ("coords", "coords"),
+                        ("itemconfig", "itemconfig"),
+                        ("itemconfigure", "itemconfig"),
+                        ("delete", "delete"), ("tag_raise", "restack"),
+                        ("tag_lower", "restack"), ("lift", "restack"),
+                        ("lower", "restack"))
+
+    def __init__(self, canvas, profiler):
+        self._canvas = canvas
+        for name in self.CREATE_METHODS:
+            self._wrap(name, "create", profiler)
+        for name, key in self.PROFILED_METHODS:
+            self._wrap(name, key, profiler)
+
+    def __getattr__(self, name):
+        return getattr(self._canvas, name)
+
+    def _wrap(self, name, key, profiler):
+        method = getattr(self._canvas, name, None)
+        if method is None:
+            return
+        def profiled(*args, **options):
+            start = time.perf_counter()
+            result = method(*args, **options)
+            profiler._record(key, time.perf_counter() - start)
+            return result
+        setattr(self, name, profiled)
+
+# Private class: _GRetainedCanvas
+
+class _GRetainedCanvas:
+    """
+    This class stands in for the canvas of a window in retained mode.
+    It records the kind, coordinates, and options of every item it
+    creates, grouped by the object that was being installed, which
+    <code>_begin_install</code> stores in <code>_current</code>.  Each
+    record is a list of the form
+    <code>[ kind, coords, options, stale, names ]</code>, where
+    <code>names</code> holds the options given when the item was
+    created.  Calls that change items keep the records up to date or
+    mark them stale, and <code>itemconfig</code> calls that would not
+    change anything are dropped.  During a rebuild, the create calls of
+    an object are matched in order against the items it already owns,
+    and an item of the same kind created with the same option names is
+    reused.  Everything else is passed straight through to the canvas.
+    """
+
+    STATS = ("reused", "updated", "created", "deleted", "restacked")
+    KINDS = ("arc", "image", "line", "oval", "polygon", "rectangle", "text")
+
+    def __init__(self, canvas):
+        self._records = { }
+        self._owners = { }
+        self._owner_of = { }
+        self._stale_tags = { }
+        self._current = None
+        self._rendering = False
+        self._claimed = None
+        self._visited = None
+        self._order = None
+        self._stats = dict.fromkeys(self.STATS, 0)
+        self._set_canvas(canvas)
+
+    def __getattr__(self, name):
+        return getattr(self._canvas, name)
+
+    def _set_canvas(self, canvas):
+        """
+        Replaces the canvas that this object passes calls through to,
+        which changes when profiling is turned on or off.
+        """
+        self._canvas = canvas
+        for kind in self.KINDS:
+            self._define_create(kind)
+
+    def _define_create(self, kind):
+        method = getattr(self._canvas, "create_" + kind)
+        def create(*args, **options):
+            return self._create(kind, method, args, options)
+        setattr(self, "create_" + kind, create)
+
+    def move(self, tag_or_id, dx, dy):
+        self._mark_stale(tag_or_id, False)
+        self._canvas.move(tag_or_id, dx, dy)
+
+    def coords(self, tag_or_id, *args):
+        if len(args) == 0:
+            return self._canvas.coords(tag_or_id)
+        record = self._records.get(tag_or_id)
+        if record is not None:
+            record[1] = _flatten_coords(args)
+        else:
+            self._mark_stale(tag_or_id, False)
+        self._canvas.coords(tag_or_id, *args)
+
+    def itemconfig(self, tag_or_id, **options):
+        record = self._records.get(tag_or_id)
+        if record is not None:
+            old = record[2]
+            if old is not None:
+                changed = { }
+                for name, value in options.items():
+                    if name not in old or old[name] != value:
+                        changed[name] = value
+                if len(changed) == 0:
+                    return
+                old.update(changed)
+                options = changed
+        else:
+            self._mark_stale(tag_or_id, True)
+        self._canvas.itemconfig(tag_or_id, **options)
+
+    itemconfigure = itemconfig
+
+    def delete(self, *tags_or_ids):
+        if "all" in tags_or_ids:
+            self._records = { }
+            self._owners = { }
+            self._owner_of = { }
+            self._stale_tags = { }
+        else:
+            for tag_or_id in tags_or_ids:
+                if tag_or_id in self._records:
+                    self._forget(tag_or_id)
+                elif isinstance(tag_or_id, str):
+                    for tkid in self._canvas.find_withtag(tag_or_id):
+                        self._forget(tkid)
+        self._canvas.delete(*tags_or_ids)
+
+    def _create(self, kind, method, args, options):
+        """
+        Creates an item for the current object or, during a rebuild,
+        reuses the next item it owns if that has the same kind and the
+        same option names.  A reused item only receives the coordinates
+        and options that differ from its record.
+        """
+        gobj = self._current
+        key = id(gobj)
+        coords = _flatten_coords(args)
+        names = frozenset(options)
+        if self._rendering:
+            index = self._claimed.get(key, 0)
+            self._claimed[key] = index + 1
+            owned = self._owners.get(key)
+            if owned is not None and index < len(owned[1]):
+                tkid = owned[1][index]
+                record = self._records[tkid]
+                if record[0] == kind and record[2] is not None and \
+                   record[4] == names:
+                    self._reuse(tkid, record, coords, options)
+                    self._visit(gobj, tkid)
+                    return tkid
+        tkid = method(*args, **options)
+        self._records[tkid] = [ kind, coords, dict(options), False, names ]
+        self._stats["created"] += 1
+        if self._rendering:
+            self._visit(gobj, tkid)
+        else:
+            owned = self._owners.get(key)
+            if owned is None:
+                self._owners[key] = [ gobj, [ tkid ] ]
+            else:
+                owned[1].append(tkid)
+            self._owner_of[tkid] = key
+        return tkid
+
+    def _reuse(self, tkid, record, coords, options):
+        """
+        Brings the reused item tkid up to date with a single
+        <code>coords</code> call and a single <code>itemconfig</code>
+        call, each made only if something has changed.
+        """
+        updated = False
+        if record[3] or record[1] != coords:
+            self._canvas.coords(tkid, *coords)
+            record[1] = coords
+            record[3] = False
+            updated = True
+        old = record[2]
+        changed = { }
+        for name, value in options.items():
+            if old[name] != value:
+                changed[name] = value
+        if len(changed) > 0:
+            self._canvas.itemconfig(tkid, **changed)
+            old.update(changed)
+            updated = True
+        self._stats["reused"] += 1
+        if updated:
+            self._stats["updated"] += 1
+
+    def _visit(self, gobj, tkid):
+        key = id(gobj)
+        visited = self._visited.get(key)
+        if visited is None:
+            self._visited[key] = [ gobj, [ tkid ] ]
+        else:
+            visited[1].append(tkid)
+        self._order.append(tkid)
+
+    def _forget(self, tkid):
+        self._records.pop(tkid, None)
+        key = self._owner_of.pop(tkid, None)
+        if key is not None:
+            owned = self._owners[key]
+            owned[1].remove(tkid)
+            if len(owned[1]) == 0:
+                del self._owners[key]
+
+    def _mark_stale(self, tag_or_id, options):
+        """
+        Records that the items matching tag_or_id have moved, or that
+        their options have changed in ways the records do not show.
+        Tags are looked up at the start of the next rebuild.
+        """
+        record = self._records.get(tag_or_id)
+        if record is not None:
+            record[3] = True
+            if options:
+                record[2] = None
+        elif isinstance(tag_or_id, str):
+            self._stale_tags[tag_or_id] = \
+                self._stale_tags.get(tag_or_id, False) or options
+
+    def _begin_render(self):
+        for tag, options in self._stale_tags.items():
+            for tkid in self._canvas.find_withtag(tag):
+                self._mark_stale(tkid, options)
+        self._stale_tags = { }
+        self._rendering = True
+        self._claimed = { }
+        self._visited = { }
+        self._order = [ ]
+
+    def _end_render(self):
+        """
+        Deletes the items that no object claimed during the rebuild,
+        including any item the records do not know, and then moves the
+        items whose position in the display list is wrong.  The items
+        that form the longest run already in the right order stay where
+        they are, and every other item is raised just above the item
+        that should precede it.
+        """
+        self._rendering = False
+        owners = self._visited
+        owner_of = { }
+        for key, owned in owners.items():
+            for tkid in owned[1]:
+                owner_of[tkid] = key
+        self._visited = None
+        self._claimed = None
+        self._owners = owners
+        self._owner_of = owner_of
+        order = self._order
+        self._order = None
+        displayed = self._canvas.find_all()
+        unused = [ tkid for tkid in displayed if tkid not in owner_of ]
+        if len(unused) > 0:
+            for tkid in unused:
+                self._records.pop(tkid, None)
+            self._canvas.delete(*unused)
+            self._stats["deleted"] += len(unused)
+            displayed = [ tkid for tkid in displayed if tkid in owner_of ]
+        if len(displayed) == len(order) and list(displayed) == order:
+            return
+        position = { }
+        for i, tkid in enumerate(displayed):
+            position[tkid] = i
+        keep = _longest_increasing_run([ position[tkid] for tkid in order ])
+        for i, tkid in enumerate(order):
+            if i not in keep:
+                if i == 0:
+                    self._canvas.tag_lower(tkid)
+                else:
+                    self._canvas.tag_raise(tkid, order[i - 1])
+                self._stats["restacked"] += 1
+
+# Private class: _GTimerQueue
+
+class _GTimerQueue:
+    """
+    This class keeps the pending timers of a window in a heap ordered by
+    the time at which they are due and runs all of them from a single
+    canvas <code>after</code> callback, which is always set for the
+    earliest timer.  Each entry is a list of the form
+    <code>[ due, sequence, fn ]</code>.  Cancelling an entry clears its
+    function and leaves it in the heap until it reaches the top or
+    until cancelled entries make up more than half of the heap, at
+    which point the heap is rebuilt without them.
+    """
+
+    def __init__(self, gw):
+        self._gw = gw
+        self._heap = [ ]
+        self._sequence = 0
+        self._cancelled = 0
+        self._after_id = None
+        self._armed_time = None
+        self._firing = False
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def schedule(self, due, fn):
+        """
+        Arranges for fn to be called at the time due, measured in
+        milliseconds on the clock returned by <code>_get_time</code>,
+        and returns the entry, which is needed to cancel the call.
+        """
+        entry = [ due, self._sequence, fn ]
+        self._sequence += 1
+        heapq.heappush(self._heap, entry)
+        if not self._firing and \
+           (self._armed_time is None or due < self._armed_time):
+            self._arm(due)
+        return entry
+
+    def cancel(self, entry):
+        """
+        Cancels a scheduled call if it has not yet run.
+        """
+        if entry[2] is None:
+            return
+        entry[2] = None
+        self._cancelled += 1
+        if self._cancelled > __TIMER_COMPACT_SIZE__ and \
+           2 * self._cancelled > len(self._heap):
+            self._heap = [ e for e in self._heap if e[2] is not None ]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        if len(self) == 0 and not self._firing:
+            self._disarm()
+
+    def clear(self):
+        """
+        Cancels every scheduled call.
+        """
+        for entry in self._heap:
+            entry[2] = None
+        self._heap = [ ]
+        self._cancelled = 0
+        self._disarm()
+
+    def _arm(self, due):
+        self._disarm()
+        delay = due - self._gw._get_time() - __FRAME_TOLERANCE__
+        delay = int(math.ceil(max(0, delay)))
+        self._after_id = self._gw._canvas.after(delay, self._fire)
+        self._armed_time = due
+
+    def _disarm(self):
+        if self._after_id is not None:
+            self._gw._canvas.after_cancel(self._after_id)
+            self._after_id = None
+        self._armed_time = None
+
+    def _fire(self):
+        """
+        Runs every entry that is due, in order.  Entries scheduled by
+        the functions themselves wait for the next callback, even if
+        they are already due, so that a zero-delay interval timer
+        cannot starve the event loop.
+        """
+        self._after_id = None
+        self._armed_time = None
+        limit = self._gw._get_time() + __FRAME_TOLERANCE__
+        sequence = self._sequence
+        profiler = self._gw._profiler
+        self._firing = True
+        try:
+            while len(self._heap) > 0 and self._heap[0][0] <= limit and \
+                  self._heap[0][1] < sequence:
+                entry = heapq.heappop(self._heap)
+                fn = entry[2]
+                if fn is None:
+                    self._cancelled -= 1
+                elif profiler is None:
+                    entry[2] = None
+                    fn()
+                else:
+                    entry[2] = None
+                    start = time.perf_counter()
+                    fn()
+                    profiler._record("timer", time.perf_counter() - start)
+        finally:
+            self._firing = False
+            heap = self._heap
+            while len(heap) > 0 and heap[0][2] is None:
+                heapq.heappop(heap)
+                self._cancelled -= 1
+            if len(heap) > 0 and self._after_id is None:
+                self._arm(heap[0][0])
+
+# Private class: _GBatch
+
+class _GBatch:
+    """
+    This class implements the context manager returned by
+    <code>GWindow.batch</code>.  Batches nest, and only the outermost
+    one applies the recorded changes.
+    """
+
+    def __init__(self, gw):
+        self._gw = gw
+
+    def __enter__(self):
+        self._gw._batch_depth += 1
+        return self._gw
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        gw = self._gw
+        gw._batch_depth -= 1
+        if gw._batch_depth == 0:
+            gw._flush_batch()
+        return False
+
 # Private class: _EventManager
 
 class _EventManager:
@@ -3362,8 +7085,19 @@ class _EventManager:
         self._down_y = None
         self._down_time = None
         self._last_click_time = None
+        self._coalescing = False
+        self._coalesced_count = 0
+        self._pending_motion = None
+        self._pending_drag = None
+        self._idle_id = None
+
+    def set_coalescing(self, flag):
+        if not flag:
+            self._flush_motion()
+        self._coalescing = flag
 
     def _press_action(self, tke):
+        self._flush_motion()
         self._down_x = tke.x
         self._down_y = tke.y
         self._down_time = time.time()
@@ -3372,6 +7106,7 @@ class _EventManager:
             fn(e)
 
     def _release_action(self, tke):
+        self._flush_motion()
         e = GMouseEvent(tke)
         for fn in self._mouseup_listeners:
             fn(e)
@@ -3390,16 +7125,57 @@ class _EventManager:
                             self._last_click_time = None
 
     def _motion_action(self, tke):
+        if self._coalescing:
+            if self._pending_motion is not None:
+                self._coalesced_count += 1
+            self._pending_motion = tke
+            self._request_flush()
+            return
         e = GMouseEvent(tke)
         for fn in self._mousemove_listeners:
             fn(e)
 
     def _drag_action(self, tke):
+        if self._coalescing:
+            if self._pending_drag is not None:
+                self._coalesced_count += 1
+            self._pending_drag = tke
+            self._request_flush()
+            return
         e = GMouseEvent(tke)
         for fn in self._drag_listeners:
             fn(e)
 
+    def _request_flush(self):
+        if self._idle_id is None:
+            self._idle_id = self._gw._canvas.after_idle(self._idle_action)
+
+    def _idle_action(self):
+        self._idle_id = None
+        self._flush_motion()
+
+    def _flush_motion(self):
+        """
+        Delivers the pending motion and drag events, if any.
+        """
+        if self._idle_id is not None:
+            self._gw._canvas.after_cancel(self._idle_id)
+            self._idle_id = None
+        motion = self._pending_motion
+        drag = self._pending_drag
+        self._pending_motion = None
+        self._pending_drag = None
+        if motion is not None:
+            e = GMouseEvent(motion)
+            for fn in self._mousemove_listeners:
+                fn(e)
+        if drag is not None:
+            e = GMouseEvent(drag)
+            for fn in self._drag_listeners:
+                fn(e)
+
     def _key_action(self, tke):
+        self._flush_motion()
         e = GKeyEvent(tke)
         for fn in self._key_listeners:
             fn(e)
@@ -3462,6 +7238,13 @@ class _EventManager:
 
 __LINE_TOLERANCE__ = 2
 __ARC_TOLERANCE__ = 2
+__COLOR_MEMO_SIZE__ = 1024
+__FONT_TABLE_SIZE__ = 64
+__FRAME_TOLERANCE__ = 1e-6
+__TIMER_COMPACT_SIZE__ = 64
+__URL_LOADER_THREADS__ = 4
+__VECTORIZE_THRESHOLD__ = 64
+__TEXT_WIDTH_CACHE_SIZE__ = 512
 
 # Color table
 
@@ -3629,6 +7412,60 @@ COLOR_TABLE = {
     "color.pink": 0xFFAFAF
 }
 
+# Derived color tables
+
+_COLOR_HEX_TABLE = {
+    name: _convert_rgb_to_color(rgb) for name, rgb in COLOR_TABLE.items()
+}
+
+_color_memo = { }
+
+_UNIT_CIRCLE_COS = [ math.cos(math.radians(i * 22.5)) for i in range(16) ]
+_UNIT_CIRCLE_SIN = [ math.sin(math.radians(i * 22.5)) for i in range(16) ]
+
+_font_table = { }
+
+# Item options accepted by the tkinter canvas, used by GHeadlessCanvas
+# to reject the options that tkinter would reject for an item kind
+
+_CANVAS_COMMON_OPTIONS = (
+    "state", "tags", "fill", "activefill", "disabledfill", "stipple",
+    "activestipple", "disabledstipple", "offset"
+)
+
+_CANVAS_SHAPE_OPTIONS = _CANVAS_COMMON_OPTIONS + (
+    "width", "activewidth", "disabledwidth", "dash", "activedash",
+    "disableddash", "dashoffset"
+)
+
+_CANVAS_OUTLINE_OPTIONS = _CANVAS_SHAPE_OPTIONS + (
+    "outline", "activeoutline", "disabledoutline", "outlinestipple",
+    "activeoutlinestipple", "disabledoutlinestipple", "outlineoffset"
+)
+
+_CANVAS_ITEM_OPTIONS = {
+    "arc": frozenset(_CANVAS_OUTLINE_OPTIONS +
+                     ("start", "extent", "style")),
+    "image": frozenset(("state", "tags", "anchor", "image",
+                        "activeimage", "disabledimage")),
+    "line": frozenset(_CANVAS_SHAPE_OPTIONS +
+                      ("arrow", "arrowshape", "capstyle", "joinstyle",
+                       "smooth", "splinesteps")),
+    "oval": frozenset(_CANVAS_OUTLINE_OPTIONS),
+    "polygon": frozenset(_CANVAS_OUTLINE_OPTIONS +
+                         ("joinstyle", "smooth", "splinesteps")),
+    "rectangle": frozenset(_CANVAS_OUTLINE_OPTIONS),
+    "text": frozenset(_CANVAS_COMMON_OPTIONS +
+                      ("anchor", "angle", "font", "justify", "text",
+                       "underline", "width"))
+}
+
+# The disk cache and thread pool for URL images are created on first
+# use.  A cache value of False means the cache has been turned off.
+
+_url_cache = None
+_url_executor = None
+
 # Check for successful compilation
 
 if __name__ == "__main__":
@@ -0,0 +1,490 @@
+# File: pgl_benchmarks.py
+
+"""
+Timing benchmarks for the pgl object model.  Each benchmark builds a
+scene of several sizes and prints the cost of one operation at each
+size, so it is easy to see whether that cost grows with the scene.
+
+Usage:
+
+    python pgl_benchmarks.py                # run every benchmark
+    python pgl_benchmarks.py remove batch   # run only the named benchmarks
+
+The benchmarks use the headless canvas so they run without a display
+and time the object model rather than Tk.  Set PGL_BACKEND=tk to time
+them against a real window instead.
+"""
+
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from pgl import GWindow, GCompound, GArc, GRect, GOval, GImage, GLabel, GPoint, GRectangle, GShapeBatch
+
+SCENE_SIZES = (100, 1000, 5000)
+WINDOW_WIDTH = 800
+WINDOW_HEIGHT = 600
+
+
+def make_scene(gw, n):
+    """Fills the window with n small randomly placed shapes and returns them."""
+    shapes = []
+    for i in range(n):
+        x = random.randint(0, WINDOW_WIDTH - 20)
+        y = random.randint(0, WINDOW_HEIGHT - 20)
+        if i % 2 == 0:
+            shape = GRect(x, y, 10, 10)
+        else:
+            shape = GOval(x, y, 10, 10)
+        shape.set_filled(True)
+        gw.add(shape)
+        shapes.append(shape)
+    return shapes
+
+
+def report(name, n, seconds, count):
+    """Prints the average cost of one operation in microseconds."""
+    print("{:<10} {:>6} objects  {:>10.1f} us/op".format(name, n, 1e6 * seconds / count))
+
+
+def bench_remove(gw, removals=100):
+    """
+    Removes targets one at a time, as clicker_game.click_action does.
+    The cost of one full rebuild is printed alongside for reference,
+    since that is what every remove used to cost.
+    """
+    for n in SCENE_SIZES:
+        gw.clear()
+        shapes = make_scene(gw, n)
+        random.shuffle(shapes)
+        start = time.perf_counter()
+        gw._rebuild()
+        report("rebuild", n, time.perf_counter() - start, 1)
+        start = time.perf_counter()
+        for shape in shapes[:removals]:
+            gw.remove(shape)
+        report("remove", n, time.perf_counter() - start, removals)
+
+
+def bench_batch(gw, frames=10):
+    """
+    Moves every shape horizontally and then vertically once per frame,
+    first with immediate updates and then inside gw.batch(), which
+    merges the two moves into one canvas call per shape.
+    """
+    for n in SCENE_SIZES:
+        gw.clear()
+        shapes = make_scene(gw, n)
+        start = time.perf_counter()
+        for frame in range(frames):
+            for shape in shapes:
+                shape.move(1, 0)
+                shape.move(0, 1)
+        report("immediate", n, time.perf_counter() - start, frames)
+        start = time.perf_counter()
+        for frame in range(frames):
+            with gw.batch():
+                for shape in shapes:
+                    shape.move(1, 0)
+                    shape.move(0, 1)
+        report("batched", n, time.perf_counter() - start, frames)
+
+
+def bench_hit(gw, queries=1000):
+    """
+    Calls get_element_at at random points, first with the linear search,
+    then with the spatial index turned on, and then with the canvas
+    hit-test engine, which asks the canvas for candidates.  The last is
+    only meaningful with PGL_BACKEND=tk, since the headless canvas
+    scans its items one by one.
+    """
+    engines = (("linear", False, "python"), ("indexed", True, "python"),
+               ("canvas", False, "canvas"))
+    for n in SCENE_SIZES:
+        gw.clear()
+        make_scene(gw, n)
+        points = [(random.uniform(0, WINDOW_WIDTH), random.uniform(0, WINDOW_HEIGHT))
+                  for i in range(queries)]
+        for name, flag, engine in engines:
+            gw.set_spatial_index(flag)
+            gw.set_hit_test_engine(engine)
+            gw.get_element_at(0, 0)
+            start = time.perf_counter()
+            for x, y in points:
+                gw.get_element_at(x, y)
+            report(name, n, time.perf_counter() - start, queries)
+        gw.set_spatial_index(False)
+        gw.set_hit_test_engine("python")
+
+
+def bench_bounds(gw, queries=1000, depth=4):
+    """
+    Builds a tree of nested compounds with the shapes at the leaves and
+    times get_bounds and contains on the root, first with every leaf
+    unchanged and then with one leaf moved before each query.
+    """
+    for n in SCENE_SIZES:
+        gw.clear()
+        root = GCompound()
+        groups = [root]
+        for level in range(depth):
+            children = []
+            for group in groups:
+                for i in range(4):
+                    child = GCompound()
+                    group.add(child)
+                    children.append(child)
+            groups = children
+        shapes = []
+        for i in range(n):
+            shape = GRect(random.uniform(0, WINDOW_WIDTH), random.uniform(0, WINDOW_HEIGHT), 10, 10)
+            random.choice(groups).add(shape)
+            shapes.append(shape)
+        gw.add(root)
+        points = [(random.uniform(0, WINDOW_WIDTH), random.uniform(0, WINDOW_HEIGHT))
+                  for i in range(queries)]
+        start = time.perf_counter()
+        for x, y in points:
+            root.get_bounds()
+            root.contains(-x, -y)
+        report("unchanged", n, time.perf_counter() - start, queries)
+        start = time.perf_counter()
+        for x, y in points:
+            random.choice(shapes).move(0, 0)
+            root.get_bounds()
+        report("one moved", n, time.perf_counter() - start, queries)
+
+
+def bench_build(gw, count=10000):
+    """
+    Builds a scene of 10,000 shapes inside a compound that is already in
+    the window, first by calling add in a loop and then with a single
+    call to add_all, and does the same at the top level of the window.
+    """
+    positions = [(random.randint(0, WINDOW_WIDTH - 20), random.randint(0, WINDOW_HEIGHT - 20))
+                 for i in range(count)]
+    for name, nested in (("nested", True), ("window", False)):
+        for bulk in (False, True):
+            gw.clear()
+            shapes = [GRect(0, 0, 10, 10) for i in range(count)]
+            target = gw
+            if nested:
+                target = GCompound()
+                gw.add(target)
+            start = time.perf_counter()
+            if bulk:
+                target.add_all(shapes, positions)
+            else:
+                for shape, (x, y) in zip(shapes, positions):
+                    target.add(shape, x, y)
+            report(name + (" all" if bulk else " add"), count, time.perf_counter() - start, 1)
+
+
+def bench_drag(gw, steps=100):
+    """
+    Drags a compound of ten shapes across the scene one step at a time,
+    as a program does while the user drags a button, and then rotates
+    it, which recreates only the items inside the compound.
+    """
+    for n in SCENE_SIZES:
+        gw.clear()
+        make_scene(gw, n)
+        group = GCompound()
+        for i in range(10):
+            group.add(GRect(10 * i, 0, 8, 8))
+        gw.add(group, 0, WINDOW_HEIGHT / 2)
+        start = time.perf_counter()
+        for i in range(steps):
+            group.move(WINDOW_WIDTH / steps, 0)
+        report("drag", n, time.perf_counter() - start, steps)
+        start = time.perf_counter()
+        for i in range(steps):
+            group.rotate(5)
+        report("rotate", n, time.perf_counter() - start, steps)
+
+
+def bench_retained(gw, rebuilds=5):
+    """
+    Rebuilds the window with and without retained mode, first with the
+    scene unchanged and then after moving a tenth of the shapes while a
+    rebuild is pending.  Besides the time, it prints the number of
+    canvas calls per rebuild, which is what a rebuild costs under Tk,
+    where every call goes through the Tcl interpreter.
+    """
+    gw.set_profiling(True)
+    profiler = gw.get_profiler()
+    keys = ("create", "coords", "itemconfig", "delete", "restack", "move")
+    for n in SCENE_SIZES:
+        gw.clear()
+        shapes = make_scene(gw, n)
+        for flag in (False, True):
+            gw.set_retained_mode(flag)
+            for name, moved in (("unchanged", ()), ("10% moved", shapes[::10])):
+                profiler.reset()
+                start = time.perf_counter()
+                for i in range(rebuilds):
+                    with gw.batch():
+                        for shape in moved:
+                            shape.move(1, 1)
+                        gw._rebuild()
+                elapsed = time.perf_counter() - start
+                profiler.end_frame()
+                totals = profiler.get_totals()
+                calls = sum(totals[key] for key in keys) // rebuilds
+                label = ("retained " if flag else "full ") + name
+                print("{:<20} {:>6} objects  {:>10.1f} us/op  {:>6} calls".format(
+                    label, n, 1e6 * elapsed / rebuilds, calls))
+        stats = gw.get_render_stats()
+        print("    reused {reused}  updated {updated}  created {created}  deleted {deleted}".format(**stats))
+        gw.set_retained_mode(False)
+    gw.set_profiling(False)
+
+
+def bench_rotated(gw, rebuilds=5, arcs=20):
+    """
+    Rebuilds a scene of rotated shapes, which are drawn as polygons
+    whose vertices all pass through the window transform.  Then rotates
+    installed arcs one step at a time, which switches them between arc
+    items and polygons or lines and back, and repeats that in batches
+    that also change the arc angles.
+    """
+    for n in SCENE_SIZES:
+        gw.clear()
+        shapes = make_scene(gw, n)
+        with gw.batch():
+            for shape in shapes:
+                shape.rotate(30)
+        start = time.perf_counter()
+        for i in range(rebuilds):
+            gw._rebuild()
+        report("rotated", n, time.perf_counter() - start, rebuilds)
+        targets = [GArc(random.randint(0, WINDOW_WIDTH - 40), random.randint(0, WINDOW_HEIGHT - 40),
+                        40, 30, 0, random.randint(30, 300)) for i in range(arcs)]
+        for i, arc in enumerate(targets):
+            arc.set_filled(i % 2 == 0)
+            gw.add(arc)
+        start = time.perf_counter()
+        for angle in (30, 15, -45):
+            for arc in targets:
+                arc.rotate(angle)
+        report("arc rotate", n, time.perf_counter() - start, 3 * arcs)
+        start = time.perf_counter()
+        for angle in (30, 15, -45):
+            with gw.batch():
+                for arc in targets:
+                    arc.set_start_angle(angle)
+                    arc.rotate(angle)
+        report("arc rotate batched", n, time.perf_counter() - start, 3 * arcs)
+
+
+def bench_zorder(gw, raises=1000):
+    """
+    Brings random shapes to the front, as a game does with its active
+    sprite, and sends others to the back.
+    """
+    for n in SCENE_SIZES:
+        gw.clear()
+        shapes = make_scene(gw, n)
+        start = time.perf_counter()
+        for i in range(raises):
+            random.choice(shapes).send_to_front()
+            random.choice(shapes).send_to_back()
+        report("z-order", n, time.perf_counter() - start, 2 * raises)
+
+
+def bench_shapes(gw, frames=60, queries=1000, count=10000):
+    """
+    Animates 10,000 bouncing targets at 60 frames per second, first as
+    individual GOvals moved inside gw.batch() and then as one
+    GShapeBatch updated with array operations, and times hit tests
+    against the batch.  A frame must take under 16.7 ms.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        print("shapes     skipped: NumPy is not installed")
+        return
+    xs = np.random.uniform(0, WINDOW_WIDTH - 10, count)
+    ys = np.random.uniform(0, WINDOW_HEIGHT - 10, count)
+    vxs = np.random.uniform(-3, 3, count)
+    vys = np.random.uniform(-3, 3, count)
+    gw.clear()
+    ovals = [GOval(x, y, 10, 10) for x, y in zip(xs.tolist(), ys.tolist())]
+    for oval in ovals:
+        oval.set_filled(True)
+        gw.add(oval)
+    start = time.perf_counter()
+    for frame in range(frames):
+        with gw.batch():
+            for oval, vx, vy in zip(ovals, vxs.tolist(), vys.tolist()):
+                oval.move(vx, vy)
+    report("objects", count, time.perf_counter() - start, frames)
+    gw.clear()
+    batch = GShapeBatch(xs, ys, 10, 10, kind="oval")
+    gw.add(batch)
+    start = time.perf_counter()
+    for frame in range(frames):
+        xs += vxs
+        ys += vys
+        vxs[(xs < 0) | (xs > WINDOW_WIDTH - 10)] *= -1
+        vys[(ys < 0) | (ys > WINDOW_HEIGHT - 10)] *= -1
+        batch.set_positions(xs, ys)
+    report("shapebatch", count, time.perf_counter() - start, frames)
+    start = time.perf_counter()
+    for frame in range(frames):
+        xs[:count // 10] += vxs[:count // 10]
+        batch.set_positions(xs[:count // 10], ys[:count // 10], np.arange(count // 10))
+    report("10% moved", count, time.perf_counter() - start, frames)
+    start = time.perf_counter()
+    for i in range(queries):
+        batch.find_shape_at(random.uniform(0, WINDOW_WIDTH), random.uniform(0, WINDOW_HEIGHT))
+    report("hit test", count, time.perf_counter() - start, queries)
+
+
+def bench_timers(gw, count=10000):
+    """
+    Starts and stops many one-shot timers, as a game does with one
+    timeout per target animation, and then lets the rest fire.  All of
+    them share a single canvas callback.
+    """
+    for n in (100, 1000, count):
+        timers = [gw.create_timer(lambda: None, random.randint(1, 1000)) for i in range(n)]
+        start = time.perf_counter()
+        for timer in timers:
+            timer.start()
+        for timer in timers[::2]:
+            timer.stop()
+        report("start/stop", n, time.perf_counter() - start, n + n // 2)
+        if gw.is_headless():
+            start = time.perf_counter()
+            gw.get_canvas().advance(1000)
+            report("fire", n, time.perf_counter() - start, n - n // 2)
+        for timer in timers:
+            timer.stop()
+
+
+def bench_import(gw, runs=5, calls=1000):
+    """
+    Measures the time to import pgl in a fresh interpreter, as reported
+    by python -X importtime, and lists the slowest modules it pulls in.
+    Also times get_program_name, which every GWindow calls.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for i in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import pgl"],
+                                cwd=here, capture_output=True, text=True)
+        modules = []
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                modules.append((int(fields[1]), fields[2].rstrip()))
+        total = [us for us, name in modules if name.strip() == "pgl"]
+        if total and (best is None or total[0] < best[0]):
+            best = (total[0], modules)
+    if best is None:
+        print("import     failed")
+        return
+    report("import", 1, best[0] / 1e6, 1)
+    for us, name in sorted(best[1], reverse=True)[1:6]:
+        print("    {:>10} us  {}".format(us, name.strip()))
+    start = time.perf_counter()
+    for i in range(calls):
+        GWindow.get_program_name()
+    report("progname", 1, time.perf_counter() - start, calls)
+
+
+def bench_memory(gw, count=10000):
+    """
+    Prints the memory allocated per object for the most common classes,
+    measured with tracemalloc over a large batch of instances.
+    """
+    factories = [
+        ("GRect", lambda i: GRect(i, i, 10, 10)),
+        ("GOval", lambda i: GOval(i, i, 10, 10)),
+        ("GLabel", lambda i: GLabel("label", i, i)),
+        ("GPoint", lambda i: GPoint(i, i)),
+        ("GRectangle", lambda i: GRectangle(i, i, 10, 10)),
+    ]
+    for name, factory in factories:
+        factory(0)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory(i) for i in range(count)]
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print("{:<10} {:>6} objects  {:>10.1f} bytes/object".format(name, len(objects), used / count))
+
+
+def bench_raster(gw, frames=3):
+    """
+    Renders the scene with the pgl_raster software rasterizer, without
+    antialiasing and with 2x2 and 4x4 supersampling.
+    """
+    gw = GWindow(WINDOW_WIDTH, WINDOW_HEIGHT, backend="raster")
+    canvas = gw.get_canvas()
+    for n in SCENE_SIZES:
+        gw.clear()
+        make_scene(gw, n)
+        for samples in (1, 2, 4):
+            start = time.perf_counter()
+            for frame in range(frames):
+                canvas.render(samples)
+            report("render x" + str(samples), n, time.perf_counter() - start, frames)
+    gw.close()
+
+
+def bench_pixels(gw, width=1920, height=1080):
+    """
+    Converts a full-HD pixel array into a GImage and back, and reads the
+    RGBA buffer of the image.  These operations require Pillow.
+    """
+    pixels = [[random.getrandbits(32) for j in range(width)] for i in range(height)]
+    try:
+        start = time.perf_counter()
+        image = GImage(pixels)
+        report("from array", width * height, time.perf_counter() - start, 1)
+    except ImportError as e:
+        print("pixels     skipped: " + str(e))
+        return
+    start = time.perf_counter()
+    image.get_pixel_array()
+    report("to array", width * height, time.perf_counter() - start, 1)
+    start = time.perf_counter()
+    GImage.from_buffer(image.get_pixel_buffer())
+    report("buffer", width * height, time.perf_counter() - start, 1)
+
+
+BENCHMARKS = {
+    "remove": bench_remove,
+    "batch": bench_batch,
+    "hit": bench_hit,
+    "zorder": bench_zorder,
+    "rotated": bench_rotated,
+    "retained": bench_retained,
+    "drag": bench_drag,
+    "build": bench_build,
+    "bounds": bench_bounds,
+    "shapes": bench_shapes,
+    "raster": bench_raster,
+    "timers": bench_timers,
+    "import": bench_import,
+    "memory": bench_memory,
+    "pixels": bench_pixels,
+}
+
+
+def main(names):
+    random.seed(0)
+    backend = os.environ.get("PGL_BACKEND", "headless")
+    gw = GWindow(WINDOW_WIDTH, WINDOW_HEIGHT, backend=backend)
+    for name in names or BENCHMARKS:
+        BENCHMARKS[name](gw)
+    gw.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,525 @@
+# File: pgl_raster.py
+
+"""
+The pgl_raster module implements a software rasterizer for pgl.  A
+<code>GRasterCanvas</code> records the canvas items of a window in the
+same way as <code>GHeadlessCanvas</code> and can render them at any time
+into a NumPy array of RGBA pixels, which can then be written out as a
+PPM or PNG file.  It makes it possible to produce thumbnails and
+regression images of a scene without a display.
+
+To render a window, create it with the raster backend:
+
+    gw = GWindow(400, 300, backend="raster")
+    ... add objects ...
+    gw.get_canvas().save("scene.png", samples=4)
+
+Each shape is rasterized by evaluating a coverage test over a grid of
+sample points that spans only its bounding box.  Antialiasing uses the
+supersampling approach from Lab5.hs: each pixel is split into an
+n x n grid of subsamples and its coverage is the fraction of those
+subsamples that fall inside the shape.
+"""
+
+import math
+import struct
+import zlib
+
+import numpy as np                          # pylint: disable=import-error
+
+from pgl import GHeadlessCanvas, GWindow, __COLOR_MEMO_SIZE__
+
+# Class: GRasterCanvas
+
+class GRasterCanvas(GHeadlessCanvas):
+    """
+    This class extends <code>GHeadlessCanvas</code> with the ability to
+    render its items into a NumPy array.  Items are drawn in display
+    order, with the same default colors that the tkinter canvas uses.
+    Labels are approximated by one block per character, and text
+    rotation is ignored.
+    """
+
+    DEFAULT_BACKGROUND = "white"
+    DEFAULT_SAMPLES = 1
+
+# Constructor: GRasterCanvas
+
+    def __init__(self, width=GWindow.DEFAULT_WIDTH,
+                 height=GWindow.DEFAULT_HEIGHT,
+                 background=DEFAULT_BACKGROUND, samples=DEFAULT_SAMPLES):
+        """
+        Creates an empty raster canvas with the specified size.  The
+        <code>samples</code> parameter sets the default number of
+        subsamples along each axis of a pixel, so a value of 1 turns
+        antialiasing off.
+        """
+        GHeadlessCanvas.__init__(self, width, height)
+        self._background = background
+        self._samples = samples
+
+# Public method: render
+
+    def render(self, samples=None):
+        """
+        Renders every visible item and returns the image as a NumPy
+        array of unsigned bytes with shape (height, width, 4).  The
+        optional <code>samples</code> parameter overrides the
+        antialiasing level set in the constructor.
+        """
+        if samples is None:
+            samples = self._samples
+        width = int(math.ceil(self._width))
+        height = int(math.ceil(self._height))
+        pixels = np.empty((height, width, 3), dtype=np.float32)
+        pixels[:, :] = _parse_color(self._background)
+        renderer = _GRasterRenderer(pixels, max(1, int(samples)))
+        for tkid in self._display_order():
+            item = self._items[tkid]
+            if item.options.get("state", "normal") != "hidden":
+                renderer.draw(item)
+        rgba = np.empty((height, width, 4), dtype=np.uint8)
+        np.clip(pixels + 0.5, 0, 255, out=pixels)
+        rgba[:, :, :3] = pixels
+        rgba[:, :, 3] = 255
+        return rgba
+
+# Public method: write_ppm
+
+    def write_ppm(self, filename, samples=None):
+        """
+        Renders the canvas and writes it to a binary PPM file.
+        """
+        rgba = self.render(samples)
+        height, width = rgba.shape[:2]
+        with open(filename, "wb") as f:
+            f.write("P6\n{} {}\n255\n".format(width, height).encode("ascii"))
+            f.write(np.ascontiguousarray(rgba[:, :, :3]).tobytes())
+
+# Public method: write_png
+
+    def write_png(self, filename, samples=None):
+        """
+        Renders the canvas and writes it to a PNG file.  The file is
+        encoded directly with zlib, so PIL is not required.
+        """
+        rgba = self.render(samples)
+        height, width = rgba.shape[:2]
+        rows = np.empty((height, 1 + 4 * width), dtype=np.uint8)
+        rows[:, 0] = 0
+        rows[:, 1:] = rgba.reshape(height, 4 * width)
+        header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        with open(filename, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(_png_chunk(b"IHDR", header))
+            f.write(_png_chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+            f.write(_png_chunk(b"IEND", b""))
+
+# Public method: save
+
+    def save(self, filename, samples=None):
+        """
+        Renders the canvas and writes it to the specified file, choosing
+        PNG or PPM from the file extension.
+        """
+        if filename.lower().endswith((".ppm", ".pnm")):
+            self.write_ppm(filename, samples)
+        elif filename.lower().endswith(".png"):
+            self.write_png(filename, samples)
+        else:
+            raise Exception("save: Unsupported image format - " + filename)
+
+# Define camel-case names
+
+    writePPM = write_ppm
+    writePNG = write_png
+
+# Private class: _GRasterRenderer
+
+class _GRasterRenderer:
+    """
+    This class draws canvas items into a floating-point RGB buffer.
+    Every draw method computes a boolean inside test over the subsample
+    grid of the bounding box of the item and blends the resulting
+    coverage into the buffer.
+    """
+
+    def __init__(self, pixels, samples):
+        self._pixels = pixels
+        self._samples = samples
+        self._offsets = (np.arange(samples, dtype=np.float32) + 0.5) / samples
+        size = max(pixels.shape[:2])
+        self._coords = np.arange(size, dtype=np.float32)[:, None]
+
+    def draw(self, item):
+        fn = getattr(self, "_draw_" + item.kind, None)
+        if fn is not None:
+            fn(item.coords, item.options)
+
+# Item methods
+
+    def _draw_rectangle(self, coords, options):
+        x0, y0, x1, y1 = _normalize_box(coords)
+        fill = options.get("fill", "")
+        outline = options.get("outline", "black")
+        half = _line_width(options) / 2
+        if outline == "":
+            half = 0
+        grid = self._grid(x0 - half, y0 - half, x1 + half, y1 + half)
+        if grid is None:
+            return
+        xs, ys = grid[:2]
+        outer = ((ys >= y0 - half) & (ys <= y1 + half)) & \
+                ((xs >= x0 - half) & (xs <= x1 + half))
+        if fill != "" and fill == outline:
+            self._blend(grid, outer, fill)
+            return
+        if fill != "":
+            inside = ((ys >= y0) & (ys <= y1)) & ((xs >= x0) & (xs <= x1))
+            self._blend(grid, inside, fill)
+        if outline != "":
+            inner = ((ys > y0 + half) & (ys < y1 - half)) & \
+                    ((xs > x0 + half) & (xs < x1 - half))
+            self._blend(grid, outer & ~inner, outline)
+
+    def _draw_oval(self, coords, options):
+        self._draw_ellipse(coords, options, None, "pieslice")
+
+    def _draw_arc(self, coords, options):
+        start = float(options.get("start", 0))
+        extent = float(options.get("extent", 90))
+        style = options.get("style", "pieslice")
+        self._draw_ellipse(coords, options, (start, extent), style)
+
+    def _draw_line(self, coords, options):
+        color = options.get("fill", "black")
+        if color == "" or len(coords) < 4:
+            return
+        self._stroke(coords, _line_width(options) / 2, color, False)
+
+    def _draw_polygon(self, coords, options):
+        if len(coords) < 6:
+            return
+        fill = options.get("fill", "black")
+        outline = options.get("outline", "")
+        if fill != "":
+            x0, y0, x1, y1 = _coords_box(coords)
+            grid = self._grid(x0, y0, x1, y1)
+            if grid is not None:
+                xs, ys = grid[:2]
+                self._blend(grid, _polygon_mask(xs, ys, coords), fill)
+        if outline != "":
+            self._stroke(coords, _line_width(options) / 2, outline, True)
+
+    def _draw_text(self, coords, options):
+        text = str(options.get("text", ""))
+        color = options.get("fill", "black")
+        if text == "" or color == "":
+            return
+        ascent, descent, char_width = _text_metrics(options.get("font"))
+        width = char_width * len(text)
+        x, y = _anchor_origin(coords[0], coords[1], width,
+                              ascent + descent, options.get("anchor", "center"))
+        top = y + 0.3 * ascent
+        bottom = y + ascent
+        for i, ch in enumerate(text):
+            if ch.isspace():
+                continue
+            left = x + (i + 0.15) * char_width
+            right = x + (i + 0.85) * char_width
+            grid = self._grid(left, top, right, bottom)
+            if grid is not None:
+                xs, ys = grid[:2]
+                mask = (xs >= left) & (xs <= right) & \
+                       (ys >= top) & (ys <= bottom)
+                self._blend(grid, mask, color, 0.6)
+
+    def _draw_image(self, coords, options):
+        photo = options.get("image")
+        if photo is None:
+            return
+        src = _image_pixels(getattr(photo, "image", photo))
+        h, w = src.shape[:2]
+        x, y = _anchor_origin(coords[0], coords[1], w, h,
+                              options.get("anchor", "center"))
+        x = int(round(x))
+        y = int(round(y))
+        height, width = self._pixels.shape[:2]
+        dx0 = max(0, x)
+        dy0 = max(0, y)
+        dx1 = min(width, x + w)
+        dy1 = min(height, y + h)
+        if dx0 >= dx1 or dy0 >= dy1:
+            return
+        patch = src[dy0 - y:dy1 - y, dx0 - x:dx1 - x].astype(np.float32)
+        alpha = patch[:, :, 3:] / 255
+        region = self._pixels[dy0:dy1, dx0:dx1]
+        region += (patch[:, :, :3] - region) * alpha
+
+# Private methods
+
+    def _draw_ellipse(self, coords, options, sweep, style):
+        x0, y0, x1, y1 = _normalize_box(coords)
+        cx = (x0 + x1) / 2
+        cy = (y0 + y1) / 2
+        rx = (x1 - x0) / 2
+        ry = (y1 - y0) / 2
+        fill = options.get("fill", "")
+        outline = options.get("outline", "black")
+        half = _line_width(options) / 2
+        if rx <= 0 or ry <= 0:
+            return
+        if style == "arc":
+            fill = ""
+        if outline == "":
+            half = 0
+        grid = self._grid(x0 - half, y0 - half, x1 + half, y1 + half)
+        if grid is None:
+            return
+        xs, ys = grid[:2]
+        if sweep is None and fill != "" and fill == outline:
+            mask = _ellipse_distance(xs, ys, cx, cy, rx, ry, half) <= 1
+            self._blend(grid, mask, fill)
+            return
+        if fill != "":
+            mask = _ellipse_distance(xs, ys, cx, cy, rx, ry, 0) <= 1
+            if sweep is not None:
+                mask &= _sweep_mask(xs, ys, cx, cy, rx, ry, sweep)
+            self._blend(grid, mask, fill)
+        if outline != "":
+            mask = _ellipse_distance(xs, ys, cx, cy, rx, ry, half) <= 1
+            if rx > half and ry > half:
+                mask &= _ellipse_distance(xs, ys, cx, cy, rx, ry, -half) > 1
+            if sweep is not None:
+                mask &= _sweep_mask(xs, ys, cx, cy, rx, ry, sweep)
+                if style == "pieslice" and abs(sweep[1]) < 360:
+                    for angle in (sweep[0], sweep[0] + sweep[1]):
+                        theta = math.radians(angle)
+                        ex = cx + rx * math.cos(theta)
+                        ey = cy - ry * math.sin(theta)
+                        mask |= _segment_mask(xs, ys, cx, cy, ex, ey, half)
+            self._blend(grid, mask, outline)
+
+    def _stroke(self, coords, half, color, closed):
+        half = max(half, 0.5)
+        x0, y0, x1, y1 = _coords_box(coords)
+        grid = self._grid(x0 - half, y0 - half, x1 + half, y1 + half)
+        if grid is None:
+            return
+        xs, ys = grid[:2]
+        points = [ (coords[i], coords[i + 1])
+                   for i in range(0, len(coords) - 1, 2) ]
+        if closed:
+            points.append(points[0])
+        mask = np.zeros((ys.shape[0], xs.shape[1]), dtype=bool)
+        for i in range(len(points) - 1):
+            xa, ya = points[i]
+            xb, yb = points[i + 1]
+            mask |= _segment_mask(xs, ys, xa, ya, xb, yb, half)
+        self._blend(grid, mask, color)
+
+    def _grid(self, x0, y0, x1, y1):
+        """
+        Returns the subsample coordinates of the pixels that overlap the
+        box, clipped to the canvas, as a row vector of x values, a
+        column vector of y values, and the pixel bounds.  Returns
+        <code>None</code> if the box misses the canvas.
+        """
+        height, width = self._pixels.shape[:2]
+        px0 = max(0, int(math.floor(x0)))
+        py0 = max(0, int(math.floor(y0)))
+        px1 = min(width, int(math.ceil(x1)) + 1)
+        py1 = min(height, int(math.ceil(y1)) + 1)
+        if px0 >= px1 or py0 >= py1:
+            return None
+        xs = (self._coords[px0:px1] + self._offsets).reshape(1, -1)
+        ys = (self._coords[py0:py1] + self._offsets).reshape(-1, 1)
+        return xs, ys, px0, py0, px1, py1
+
+    def _blend(self, grid, mask, color, opacity=1.0):
+        px0, py0, px1, py1 = grid[2:]
+        n = self._samples
+        if n == 1:
+            coverage = mask.astype(np.float32)
+        else:
+            coverage = mask.reshape(py1 - py0, n, px1 - px0, n) \
+                           .mean(axis=(1, 3), dtype=np.float32)
+        if opacity != 1.0:
+            coverage *= opacity
+        region = self._pixels[py0:py1, px0:px1]
+        region += (_parse_color(color) - region) * coverage[:, :, None]
+
+# Private function: _parse_color
+
+_color_cache = { }
+
+def _parse_color(color):
+    """
+    Returns the RGB components of a pgl or tkinter color as a NumPy
+    vector of floats.  Like the color memo in pgl, the cache is cleared
+    when it reaches <code>__COLOR_MEMO_SIZE__</code> entries.
+    """
+    rgb = _color_cache.get(color)
+    if rgb is None:
+        if color.startswith("#") and len(color) == 4:
+            value = int("".join(c + c for c in color[1:]), 16)
+        else:
+            value = GWindow.convert_color_to_rgb(color)
+        rgb = np.array([ (value >> 16) & 0xFF, (value >> 8) & 0xFF,
+                         value & 0xFF ], dtype=np.float32)
+        if len(_color_cache) >= __COLOR_MEMO_SIZE__:
+            _color_cache.clear()
+        _color_cache[color] = rgb
+    return rgb
+
+# Private function: _png_chunk
+
+def _png_chunk(kind, data):
+    """
+    Returns one PNG chunk with its length and CRC.
+    """
+    crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+# Private function: _line_width
+
+def _line_width(options):
+    return float(options.get("width", 1))
+
+# Private function: _normalize_box
+
+def _normalize_box(coords):
+    x0, y0, x1, y1 = coords[:4]
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+# Private function: _coords_box
+
+def _coords_box(coords):
+    xs = coords[0::2]
+    ys = coords[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+# Private function: _anchor_origin
+
+def _anchor_origin(x, y, width, height, anchor):
+    """
+    Returns the upper left corner of a box of the given size whose
+    anchor point, in the tkinter sense, lies at (x, y).
+    """
+    if "w" in anchor:
+        left = x
+    elif "e" in anchor:
+        left = x - width
+    else:
+        left = x - width / 2
+    if anchor.startswith("n"):
+        top = y
+    elif anchor.startswith("s"):
+        top = y - height
+    else:
+        top = y - height / 2
+    return left, top
+
+# Private function: _ellipse_distance
+
+def _ellipse_distance(xs, ys, cx, cy, rx, ry, grow):
+    """
+    Returns the normalized squared distance of each sample from the
+    center of the ellipse whose radii are extended by grow.  Samples
+    inside the ellipse have values no greater than 1.
+    """
+    ex = (xs - cx) / (rx + grow)
+    ey = (ys - cy) / (ry + grow)
+    return ex * ex + ey * ey
+
+# Private function: _sweep_mask
+
+def _sweep_mask(xs, ys, cx, cy, rx, ry, sweep):
+    """
+    Returns the samples whose angle on the ellipse lies within the sweep
+    of an arc.  Angles follow tkinter: degrees counterclockwise from the
+    positive x axis, with y pointing up.
+    """
+    start, extent = sweep
+    if abs(extent) >= 360:
+        return np.ones((ys.shape[0], xs.shape[1]), dtype=bool)
+    theta = np.degrees(np.arctan2((cy - ys) / ry, (xs - cx) / rx))
+    if extent >= 0:
+        return (theta - start) % 360 <= extent
+    return (start - theta) % 360 <= -extent
+
+# Private function: _segment_mask
+
+def _segment_mask(xs, ys, xa, ya, xb, yb, half):
+    """
+    Returns the samples within half of the segment from (xa, ya) to
+    (xb, yb).
+    """
+    dx = xb - xa
+    dy = yb - ya
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        px = xs - xa
+        py = ys - ya
+    else:
+        t = np.clip(((xs - xa) * dx + (ys - ya) * dy) / length_sq, 0, 1)
+        px = xs - (xa + t * dx)
+        py = ys - (ya + t * dy)
+    return px * px + py * py <= half * half
+
+# Private function: _polygon_mask
+
+def _polygon_mask(xs, ys, coords):
+    """
+    Returns the samples inside the polygon using the even-odd rule,
+    which is the rule the tkinter canvas uses.
+    """
+    inside = np.zeros((ys.shape[0], xs.shape[1]), dtype=bool)
+    n = len(coords) // 2
+    for i in range(n):
+        xa = coords[2 * i]
+        ya = coords[2 * i + 1]
+        xb = coords[(2 * i + 2) % (2 * n)]
+        yb = coords[(2 * i + 3) % (2 * n)]
+        if ya == yb:
+            continue
+        crosses = (ya > ys) != (yb > ys)
+        xint = xa + (ys - ya) * ((xb - xa) / (yb - ya))
+        inside ^= crosses & (xs < xint)
+    return inside
+
+# Private function: _text_metrics
+
+def _text_metrics(font):
+    """
+    Returns the ascent, descent, and average character width of a font,
+    which may be a font object or a tkinter font description.
+    """
+    if hasattr(font, "metrics"):
+        ascent = font.metrics("ascent")
+        descent = font.metrics("descent")
+        sample = "abcdefghijklmnopqrstuvwxyz"
+        return ascent, descent, font.measure(sample) / len(sample)
+    size = 12
+    if isinstance(font, str):
+        for token in font.replace("}", " ").split():
+            if token.lstrip("-").isdigit():
+                size = abs(int(token))
+                break
+    return 0.78 * size, 0.22 * size, 0.55 * size
+
+# Private function: _image_pixels
+
+def _image_pixels(image):
+    """
+    Returns the pixels of a PIL image or array as an RGBA array.
+    """
+    if hasattr(image, "convert"):
+        image = image.convert("RGBA")
+    pixels = np.asarray(image)
+    if pixels.ndim == 2:
+        pixels = np.stack([ pixels ] * 3, axis=-1)
+    if pixels.shape[2] == 3:
+        alpha = np.full(pixels.shape[:2] + (1,), 255, dtype=pixels.dtype)
+        pixels = np.concatenate([ pixels, alpha ], axis=2)
+    return pixels